@@ -1,5 +1,6 @@
 import logging
 import matcher
+import pattern_pack
 import grpc
 import analyze_pb2
 import analyze_pb2_grpc
@@ -59,16 +60,53 @@ class Analyzer(analyze_pb2_grpc.AnalyzeServiceServicer):
 
     def Apply(self, request, context):
         response = analyze_pb2.AnalyzeResponse()
-        results = self.match.analyze_text(request.text,
-                                          request.analyzeTemplate.fields)
+        truncated = set()
+        details = {}
+        metadata = dict(context.invocation_metadata())
+        # Context windows of the request, e.g. 'US_SSN=5:2'
+        context_windows = self.match.parse_context_windows(
+            metadata.get('context-windows'))
+        # Structured requests, e.g. 'json' or 'csv'
+        input_format = metadata.get('input-format')
+        try:
+            results = self.match.analyze_text(
+                request.text, request.analyzeTemplate.fields, truncated,
+                context_windows, input_format, details)
+        except ValueError as error:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(error))
+            return response
         response.analyzeResults.extend(results)
+
+        # The results of these field types are partial
+        trailing_metadata = []
+        if truncated:
+            trailing_metadata.append(
+                ('truncated-fields', ','.join(sorted(truncated))))
+        # The details of the results, by their start offset, e.g.
+        # 'card-issuers': '12=Visa;40=Mastercard'
+        for name, offsets in sorted(details.items()):
+            trailing_metadata.append(
+                (name, ';'.join('{}={}'.format(start, offsets[start])
+                                for start in sorted(offsets))))
+        if trailing_metadata:
+            context.set_trailing_metadata(tuple(trailing_metadata))
         return response
 
 
 def serve_command_handler(env_grpc_port=False, grpc_port=3000):
 
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    analyze_pb2_grpc.add_AnalyzeServiceServicer_to_server(Analyzer(), server)
+    analyzer = Analyzer()
+    analyze_pb2_grpc.add_AnalyzeServiceServicer_to_server(analyzer, server)
+
+    # Reload the pattern pack when it changes, without a restart
+    pack_path = os.environ.get('PATTERN_PACK')
+    if pack_path:
+        watcher = pattern_pack.PackWatcher(
+            pack_path, analyzer.match.load_pattern_pack,
+            float(os.environ.get('PATTERN_PACK_POLL_INTERVAL', '5')))
+        watcher.start()
 
     if env_grpc_port:
         port = os.environ.get('GRPC_PORT')
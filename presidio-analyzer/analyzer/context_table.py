@@ -0,0 +1,135 @@
+from spacy.lang.en.stop_words import STOP_WORDS
+
+VOWELS = 'aeiou'
+
+
+def _doubles_final_consonant(word):
+    """Check if the final consonant is doubled before a suffix (e.g.
+    permit -> permitted), a consonant-vowel-consonant ending"""
+
+    return len(word) > 2 and word[-1] not in VOWELS + 'wxy' and \
+        word[-2] in VOWELS and word[-3] not in VOWELS
+
+
+def inflections(word):
+    """Get the surface forms of a context word: the word, its plural (or
+    third person), past and gerund forms. The rules are the regular
+    English ones, an irregular word gets regular forms too
+
+    Args:
+      word: lowercase context word
+    """
+
+    forms = {word}
+    if not word.isalpha():
+        return forms
+
+    if word.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        forms.add(word + 'es')
+    elif word.endswith('y') and word[-2:-1] not in VOWELS:
+        forms.add(word[:-1] + 'ies')
+    else:
+        forms.add(word + 's')
+
+    if word.endswith('ee'):
+        forms.add(word + 'd')
+        forms.add(word + 'ing')
+    elif word.endswith('e'):
+        forms.add(word + 'd')
+        forms.add(word[:-1] + 'ing')
+    elif word.endswith('y') and word[-2:-1] not in VOWELS:
+        forms.add(word[:-1] + 'ied')
+        forms.add(word + 'ing')
+    else:
+        forms.add(word + 'ed')
+        forms.add(word + 'ing')
+        if _doubles_final_consonant(word):
+            forms.add(word + word[-1] + 'ed')
+            forms.add(word + word[-1] + 'ing')
+
+    return forms
+
+
+class ContextTable(object):
+    """The surface forms of the context words of the field types
+
+    The context words are inflected once, when the field types are loaded,
+    so that a context token is looked up by its lowercase text, without
+    lemmatizing it. Context phrases (e.g. 'social security') are words of
+    a trie, matched once per document (see DocumentTokens), and are then
+    keywords like the single words. The words and forms of every field
+    type are frozen sets, shared by all the requests and never modified.
+    """
+
+    def __init__(self, fields):
+        """Constructor
+
+        Args:
+          fields: field types (pattern)
+        """
+
+        self.words_by_field = {}
+        self.phrase_trie = {}
+        fields_by_form = {}
+        for field in fields:
+            words = set(' '.join(word.lower().split())
+                        for word in field.context or [])
+            self.words_by_field[field.name] = frozenset(words)
+
+            for word in words:
+                # Phrases are matched as they are, by the phrase trie
+                if ' ' in word:
+                    self.__add_phrase(word)
+                    fields_by_form.setdefault(word, set()).add(field.name)
+                    continue
+
+                # Stop words are never context keywords
+                for form in inflections(word) - STOP_WORDS:
+                    fields_by_form.setdefault(form, set()).add(field.name)
+
+        self.fields_by_form = {
+            form: frozenset(names)
+            for form, names in fields_by_form.items()
+        }
+
+        forms_by_field = {}
+        for form, names in self.fields_by_form.items():
+            for name in names:
+                forms_by_field.setdefault(name, set()).add(form)
+        self.forms_by_field = {
+            name: frozenset(forms)
+            for name, forms in forms_by_field.items()
+        }
+
+    def __add_phrase(self, phrase):
+        node = self.phrase_trie
+        for word in phrase.split(' '):
+            node = node.setdefault(word, {})
+        node[None] = phrase
+
+    def words(self, field_name):
+        """Get the context words and phrases of a field type
+
+        Args:
+          field_name: field type name
+        """
+
+        return self.words_by_field.get(field_name, frozenset())
+
+    def fields_of(self, word):
+        """Get the names of the field types a context word supports
+
+        Args:
+          word: lowercase word
+        """
+
+        return self.fields_by_form.get(word, frozenset())
+
+    def forms(self, field_name):
+        """Get all the context words of a field type, in all their forms
+
+        Args:
+          field_name: field type name
+        """
+
+        return self.forms_by_field.get(field_name, frozenset())
@@ -0,0 +1,119 @@
+import numpy as np
+from spacy.lang.en.stop_words import STOP_WORDS
+
+
+class ContextVectors(object):
+    """The word vectors of the context words of the field types, for the
+    semantic context mode
+
+    The unit vectors of the context words of all the field types are the
+    rows of a single matrix, built once with the field types. The context
+    words of the candidates of a pattern are scored against all the field
+    types at once, with a single matrix product: the similarity of a
+    candidate to a field type is the best cosine similarity of one of its
+    context words to one of the field type's context words. Every pattern
+    a request reaches has its own product, since whether a weaker pattern
+    is reached depends on the scores of the stronger ones.
+    """
+
+    def __init__(self, table, vocab):
+        """Constructor
+
+        Args:
+          table: ContextTable of the field types
+          vocab: spacy vocabulary with word vectors
+        """
+
+        self.vocab = vocab
+        # Stop words are never context keywords
+        self.excluded = STOP_WORDS
+
+        # Column of every field type in the similarities, and the first
+        # row of its context words in the matrix
+        self.columns = {}
+        bounds = []
+        rows = []
+        for name in sorted(table.words_by_field):
+            vectors = [
+                vector for vector in map(self.__vector,
+                                         sorted(table.words(name)))
+                if vector is not None
+            ]
+            if not vectors:
+                continue
+            self.columns[name] = len(bounds)
+            bounds.append(len(rows))
+            rows.extend(vectors)
+
+        self.bounds = np.array(bounds, dtype=np.intp)
+        self.matrix = np.array(rows, dtype=np.float32) if rows else None
+
+    def __vector(self, word):
+        """Get the unit vector of a word, or of a phrase (the mean of the
+        vectors of its words), None if it has no vector"""
+
+        vectors = [
+            self.vocab.get_vector(part) for part in word.split(' ')
+            if self.vocab.has_vector(part)
+        ]
+        if not vectors:
+            return None
+
+        vector = np.mean(vectors, axis=0)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def similarities(self, contexts):
+        """Get the context similarity of candidates to all the field types
+
+        Args:
+          contexts: the lowercase context keywords of every candidate
+
+        Returns:
+          array of a row per candidate, and a column per field type (see
+          columns), the best cosine similarity of a context keyword of the
+          candidate to a context word of the field type, 0 if none is
+          similar
+        """
+
+        result = np.zeros((len(contexts), len(self.columns)),
+                          dtype=np.float32)
+        if self.matrix is None:
+            return result
+
+        # The vectors of the distinct keywords of all the candidates, and
+        # the keywords of every candidate
+        rows = {}
+        vectors = []
+        keyword_rows = []
+        candidates = []
+        for candidate, keywords in enumerate(contexts):
+            for keyword in keywords:
+                row = rows.get(keyword)
+                if row is None:
+                    vector = None
+                    if keyword not in self.excluded:
+                        vector = self.__vector(keyword)
+                    row = -1 if vector is None else len(vectors)
+                    if vector is not None:
+                        vectors.append(vector)
+                    rows[keyword] = row
+                if row >= 0:
+                    keyword_rows.append(row)
+                    candidates.append(candidate)
+
+        if not vectors:
+            return result
+
+        # A single product for all the candidates, then the best context
+        # word of every field type, and the best keyword of every candidate
+        keyword_similarities = np.dot(
+            np.array(vectors, dtype=np.float32), self.matrix.T)
+        field_similarities = np.maximum.reduceat(
+            keyword_similarities, self.bounds, axis=1)
+        np.maximum.at(result, np.array(candidates, dtype=np.intp),
+                      field_similarities[keyword_rows])
+
+        return result
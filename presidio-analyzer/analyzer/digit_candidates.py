@@ -0,0 +1,172 @@
+import re2 as re
+from field_types import field_digit_pattern
+
+DIGIT_RUN_REGEX = re.compile(r'[0-9]+')
+
+# Characters which may join two digit runs into a single candidate
+SEPARATOR_BYTES = frozenset(
+    ('-.' + field_digit_pattern.WHITESPACE).encode('utf-8'))
+
+# RE2 word characters (\b), non ASCII bytes are never word characters
+WORD_BYTES = frozenset(
+    b'0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+
+
+class DigitRuns(object):
+    """The digit runs of a document, and the separators between them
+
+    The table is built once per document and shared by all the
+    DigitFieldPattern patterns.
+    """
+
+    def __init__(self, data):
+        """Constructor
+        Tokenize the digit runs of a document
+
+        Args:
+          data: document text encoded as UTF-8
+        """
+
+        self.data = data
+        self.starts = []
+        self.ends = []
+        # Separator (byte) joining a run to the previous one, or None
+        self.separators = []
+        # Whether a word boundary (\b) precedes / follows each run
+        self.left_bounded = []
+        self.right_bounded = []
+
+        previous_end = -2
+        for match in DIGIT_RUN_REGEX.finditer(data):
+            start, end = match.span()
+            separator = None
+            if start == previous_end + 1 and \
+                    data[start - 1] in SEPARATOR_BYTES:
+                separator = data[start - 1]
+
+            self.starts.append(start)
+            self.ends.append(end)
+            self.separators.append(separator)
+            self.left_bounded.append(start == 0
+                                     or data[start - 1] not in WORD_BYTES)
+            self.right_bounded.append(end == len(data)
+                                      or data[end] not in WORD_BYTES)
+            previous_end = end
+
+
+def compile_segments(segments):
+    """Normalize the alternatives of a DigitFieldPattern
+
+    Every alternative becomes a list alternating (min, max, prefixes)
+    segments and (chars, optional) separators.
+
+    Args:
+      segments: DigitFieldPattern segments
+
+    Raises:
+      ValueError: if an alternative is empty or has consecutive separators
+    """
+
+    alternatives = []
+    for alternative in segments:
+        tokens = []
+        for item in alternative:
+            if isinstance(item, field_digit_pattern.Separator):
+                if not tokens or len(tokens) % 2 == 0:
+                    raise ValueError(
+                        "Separator without a preceding digit segment")
+                tokens.append((item.chars.encode('utf-8'), item.optional))
+                continue
+
+            if len(tokens) % 2 == 1:
+                # Contiguous segments
+                tokens.append((b'', True))
+            if isinstance(item, int):
+                item = (item, item)
+            min_length, max_length = item[0], item[1]
+            prefixes = None
+            if len(item) > 2:
+                prefixes = tuple(
+                    prefix.encode('utf-8') for prefix in item[2])
+            tokens.append((min_length, max_length, prefixes))
+
+        if not tokens or len(tokens) % 2 == 0:
+            raise ValueError("Digit pattern must end with a digit segment")
+        alternatives.append(tokens)
+
+    return alternatives
+
+
+def find_matches(runs, alternatives, should_stop=None):
+    """Find the matches of a compiled DigitFieldPattern
+
+    Returns the same non overlapping matches finditer would have returned
+    for the pattern's regex, as byte offsets.
+
+    Args:
+      runs: DigitRuns of the document
+      alternatives: compiled segments (see compile_segments)
+      should_stop: optional function checked before every candidate run,
+                   the matches found so far are returned once it's true
+    """
+
+    spans = []
+    count = len(runs.starts)
+    i = 0
+    while i < count:
+        if should_stop is not None and should_stop():
+            break
+        if runs.left_bounded[i]:
+            for tokens in alternatives:
+                last = _match_segment(runs, tokens, 0, i, 0)
+                if last is not None:
+                    spans.append((runs.starts[i], runs.ends[last]))
+                    i = last
+                    break
+        i += 1
+
+    return spans
+
+
+def _match_segment(runs, tokens, k, i, offset):
+    """Match tokens[k:] from a position of the digit run i
+
+    Lengths are tried longest first, like a greedy regex, and the first
+    successful assignment is returned.
+
+    Returns:
+      the index of the run the match ends in, or None
+    """
+
+    start = runs.starts[i] + offset
+    run_length = runs.ends[i] - runs.starts[i]
+    min_length, max_length, prefixes = tokens[k]
+
+    if prefixes is not None and not runs.data.startswith(prefixes, start):
+        return None
+
+    last_segment = k == len(tokens) - 1
+    for length in range(min(max_length, run_length - offset),
+                        min_length - 1, -1):
+        position = offset + length
+        if last_segment:
+            if position == run_length and runs.right_bounded[i]:
+                return i
+            continue
+
+        chars, optional = tokens[k + 1]
+        if position == run_length:
+            # The separator must join this run to the next one
+            if i + 1 < len(runs.starts) and \
+                    runs.separators[i + 1] is not None and \
+                    runs.separators[i + 1] in chars:
+                last = _match_segment(runs, tokens, k + 2, i + 1, 0)
+                if last is not None:
+                    return last
+        elif optional:
+            # The next segment continues in the same run
+            last = _match_segment(runs, tokens, k + 2, i, position)
+            if last is not None:
+                return last
+
+    return None
@@ -0,0 +1,189 @@
+import bisect
+
+
+class DocumentTokens(object):
+    """The tokens of a parsed document, by their offsets
+
+    The context of a match is taken from the tokens the document was
+    already parsed into, instead of running the NLP pipeline on the
+    context text again. The offsets of the tokens, and the (whitespace
+    separated) word of each token, are indexed once per document, so the
+    words around a match are found with a binary search. Context phrases
+    are found in a single pass over the document, and are then looked up
+    by position too. The document may be parsed on demand, the first time
+    its tokens are needed, so requests which need no context and no
+    entities never run the NLP pipeline.
+    """
+
+    def __init__(self, doc, phrase_trie=None, text=None):
+        """Constructor
+
+        Args:
+          doc: spacy document, or a function parsing the text into one,
+               called the first time the tokens are needed
+          phrase_trie: trie of the context phrases, a dictionary of word to
+                       the trie of the next words, and None to the phrase
+                       ending at the word (see ContextTable)
+          text: document text, if doc is a function
+        """
+
+        self.parse = None
+        self.__doc = None
+        if callable(doc):
+            self.parse = doc
+        else:
+            self.__doc = doc
+        self.phrase_trie = phrase_trie
+        self.phrase_hits = None
+        self.phrase_firsts = None
+        # Context keywords of every span, shared by the field types
+        # matching it (filled by the matcher)
+        self.context_keywords = {}
+        # Keywords of the words before and after the matches, by (start,
+        # prefix count) and (end, suffix count)
+        self.prefix_keywords = {}
+        self.suffix_keywords = {}
+        # Names of the field types the context keywords of every span are
+        # context words of (filled by the matcher)
+        self.context_fields = {}
+        # Context similarities of every span to the field types, in the
+        # semantic context mode (see context_vectors)
+        self.context_similarities = {}
+        # Valid entities of every NER field type (filled by the matcher)
+        self.entities = None
+        # doc.text joins the text of all the tokens on every access
+        self.text = text if self.parse is not None else doc.text
+        self.__starts = None
+        self.__words = None
+
+    @property
+    def doc(self):
+        """The spacy document, parsed the first time it's needed"""
+
+        if self.__doc is None:
+            self.__doc = self.parse(self.text)
+        return self.__doc
+
+    @property
+    def starts(self):
+        """The start offset of every token"""
+
+        if self.__starts is None:
+            self.__index_tokens()
+        return self.__starts
+
+    @property
+    def words(self):
+        """The (whitespace separated) word number of every token"""
+
+        if self.__words is None:
+            self.__index_tokens()
+        return self.__words
+
+    def __index_tokens(self):
+        starts = []
+        words = []
+        word = -1
+        joined = False
+        for token in self.doc:
+            starts.append(token.idx)
+            if token.is_space:
+                joined = False
+            else:
+                if not joined:
+                    word += 1
+                joined = not token.whitespace_
+            words.append(word)
+
+        self.__starts = starts
+        self.__words = words
+
+    def before(self, start, count):
+        """Get the range of tokens (first, last) of the count words before
+        an offset, a word running into the offset is one of them
+
+        Args:
+          start: offset
+          count: number of words
+        """
+
+        last = bisect.bisect_left(self.starts, start)
+        if count <= 0 or last == 0:
+            return last, last
+
+        first = bisect.bisect_left(self.words,
+                                   self.words[last - 1] - count + 1)
+        return first, last
+
+    def after(self, end, count):
+        """Get the range of tokens (first, last) of the count words after
+        an offset, the rest of a word running from before the offset is
+        one of them
+
+        Args:
+          end: offset
+          count: number of words
+        """
+
+        first = bisect.bisect_left(self.starts, end)
+        if count <= 0 or first == len(self.starts):
+            return first, first
+
+        # Space tokens belong to the word before them
+        first_word = self.words[first]
+        if self.doc[first].is_space:
+            first_word += 1
+        last = bisect.bisect_right(self.words, first_word + count - 1)
+        return first, last
+
+    def words_of(self, first, last):
+        """Get the tokens of a range, without the space tokens"""
+
+        return [token for token in self.doc[first:last] if not token.is_space]
+
+    def phrases_of(self, first, last):
+        """Get the phrases of the phrase trie found within a range of
+        tokens
+
+        The whole document is matched against the trie the first time.
+        """
+
+        if first >= last:
+            return []
+        if self.phrase_hits is None:
+            self.phrase_hits = self.__match_phrases()
+            self.phrase_firsts = [hit[0] for hit in self.phrase_hits]
+
+        phrases = []
+        i = bisect.bisect_left(self.phrase_firsts, first)
+        while i < len(self.phrase_hits) and self.phrase_hits[i][0] < last:
+            if self.phrase_hits[i][1] <= last:
+                phrases.append(self.phrase_hits[i][2])
+            i += 1
+        return phrases
+
+    def __match_phrases(self):
+        """Find all the phrases of the trie in the document
+
+        Returns:
+          list of (first, last, phrase), the range of tokens of every
+          phrase found
+        """
+
+        if not self.phrase_trie:
+            return []
+
+        tokens = [(token.i, token.lower_) for token in self.doc
+                  if not token.is_space]
+        hits = []
+        for i, (first, word) in enumerate(tokens):
+            node = self.phrase_trie.get(word)
+            j = i
+            while node is not None:
+                if None in node:
+                    hits.append((first, tokens[j][0] + 1, node[None]))
+                j += 1
+                if j == len(tokens):
+                    break
+                node = node.get(tokens[j][1])
+        return hits
@@ -0,0 +1,89 @@
+import context_table
+import context_vectors
+from field_types import field_factory
+from field_types.globally import ner
+import pattern_registry
+import pattern_scanner
+
+
+class FieldRules(object):
+    """A version of the field types, with their compiled patterns and the
+    forms of their context words
+
+    Requests use a single version from start to end, a new version (e.g.
+    of a reloaded pattern pack) is built aside and replaces the current one
+    at once.
+    """
+
+    def __init__(self, pack=None, strict=False, budget=None, vocab=None):
+        """Constructor
+        Compile the patterns of all the field types
+
+        Args:
+          pack: optional PatternPack overriding the built in field types
+          strict: reject patterns which RE2 can't compile
+          budget: PatternBudget with the default limits of the patterns
+          vocab: optional spacy vocabulary with word vectors, for the
+                 semantic context mode
+
+        Raises:
+          ValueError: if a pattern can't be compiled
+        """
+
+        self.pack = pack
+        self.version = pack.version if pack is not None else None
+        if pack is not None:
+            self.types_refs = pack.types_refs()
+        else:
+            self.types_refs = field_factory.types_refs
+
+        self.context_table = None
+        self.context_vectors = None
+        fields = self.create_pattern_fields(self.types_refs)
+        self.context_table = context_table.ContextTable(fields)
+        if vocab is not None:
+            self.context_vectors = context_vectors.ContextVectors(
+                self.context_table, vocab)
+        self.registry = pattern_registry.PatternRegistry(
+            fields, strict, budget)
+
+        # Combine the patterns of all the field types into a single
+        # scanner, requests for some of the field types skip the matches of
+        # the others
+        self.scanner = pattern_scanner.PatternScanner(fields, self.registry)
+
+    def create(self, field_type_string_filter):
+        """Create a field type
+
+        Args:
+          field_type_string_filter: field type descriptor
+        """
+
+        if self.pack is not None:
+            field = self.pack.create(field_type_string_filter)
+        else:
+            field = field_factory.FieldFactory.create(field_type_string_filter)
+
+        # The context of the field type, compiled when the rules were built
+        if field is not None and self.context_table is not None:
+            field.context = self.context_table.words(field.name)
+            field.context_forms = self.context_table.forms(field.name)
+        if field is not None and self.context_vectors is not None:
+            field.context_column = self.context_vectors.columns.get(
+                field.name)
+        return field
+
+    def create_pattern_fields(self, field_type_string_filters):
+        """Create the pattern (non NER) field types of the given descriptors
+
+        Args:
+          field_type_string_filters: field type descriptors
+        """
+
+        fields = []
+        for field_type_string_filter in sorted(field_type_string_filters):
+            field = self.create(field_type_string_filter)
+            if field is not None and not isinstance(field, ner.Ner):
+                fields.append(field)
+
+        return fields
@@ -0,0 +1,55 @@
+import re2 as re
+
+# Character features a field type may require in a document
+FEATURE_DIGIT = 1
+FEATURE_AT = 2
+FEATURE_DOT = 4
+FEATURE_COLON = 8
+
+FEATURE_CHARS = [('@', FEATURE_AT), ('.', FEATURE_DOT), (':', FEATURE_COLON)]
+DIGITS = frozenset('0123456789')
+DIGIT_RUN_REGEX = re.compile(r'[0-9]+')
+
+
+class DocumentFeatures(object):
+    """Cheap features of a document, used to skip the field types which
+    can't match it"""
+
+    def __init__(self, text):
+        """Constructor
+        Extract the features of a document
+
+        Args:
+          text: document text
+        """
+
+        chars = set(text)
+
+        self.features = 0
+        for char, feature in FEATURE_CHARS:
+            if char in chars:
+                self.features |= feature
+
+        self.max_digit_run = 0
+        if not chars.isdisjoint(DIGITS):
+            self.features |= FEATURE_DIGIT
+            self.max_digit_run = max(
+                map(len, DIGIT_RUN_REGEX.findall(text)))
+
+    def can_match(self, field):
+        """Check if a field type may have matches in the document
+
+        Args:
+          field: field type, with the features it requires
+        """
+
+        if field is None:
+            return True
+
+        if self.max_digit_run < field.min_digit_run:
+            return False
+
+        # Each required feature is a mask, at least one of its features
+        # should be in the document
+        return all(self.features & required
+                   for required in field.required_features)
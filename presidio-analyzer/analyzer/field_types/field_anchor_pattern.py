@@ -0,0 +1,49 @@
+from field_types import field_regex_pattern
+
+# RE2 word characters (\w), non ASCII bytes are never word characters
+WORD_BYTES = frozenset(
+    b'0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+ALNUM_BYTES = WORD_BYTES - frozenset(b'_')
+
+
+def is_word_boundary(data, i):
+    """Check if there's a word boundary (\\b) before data[i]"""
+
+    before = i > 0 and data[i - 1] in WORD_BYTES
+    after = i < len(data) and data[i] in WORD_BYTES
+    return before != after
+
+
+def run_start(data, end, chars, stop=0):
+    """Find where the run of chars ending at data[end - 1] starts"""
+
+    start = end
+    while start > stop and data[start - 1] in chars:
+        start -= 1
+    return start
+
+
+def run_end(data, start, chars):
+    """Find where the run of chars starting at data[start] ends"""
+
+    end = start
+    while end < len(data) and data[end] in chars:
+        end += 1
+    return end
+
+
+class AnchorFieldPattern(field_regex_pattern.RegexFieldPattern):
+    """A pattern found by expanding around anchor characters
+
+    Instead of trying the regex at every position of the text, finder
+    looks for the anchor characters every match contains (e.g. '@' or
+    '.'), and expands around them. The regex, if any, is the reference
+    definition of the pattern, and both must match the same text.
+
+    finder is called with the text encoded as UTF-8, and returns the non
+    overlapping matches, as (start, end) byte offsets. Its optional second
+    argument is a function checked between anchors: once it's true, finder
+    returns the matches found so far.
+    """
+
+    finder = None
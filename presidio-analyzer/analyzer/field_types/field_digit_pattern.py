@@ -0,0 +1,30 @@
+from field_types import field_regex_pattern
+
+# Separator characters matched by \s
+WHITESPACE = ' \t\n\f\r'
+
+
+class Separator(object):
+    """Separator between two digit segments of a DigitFieldPattern"""
+
+    def __init__(self, chars, optional=False):
+        self.chars = chars
+        self.optional = optional
+
+
+class DigitFieldPattern(field_regex_pattern.RegexFieldPattern):
+    """A pattern made of digit segments and separators
+
+    Instead of scanning the text with its regex, the pattern is matched
+    against the digit runs of the document, which are extracted once for
+    all the numeric field types. The regex is the reference definition of
+    the pattern, and both must match the same text.
+
+    segments is a list of alternatives, each one a list of:
+      n / (min, max): a segment of n (min to max) digits
+      (min, max, prefixes): a segment starting with one of the prefixes
+      Separator: separator between the previous and next segments.
+                 Consecutive segments without a separator are contiguous
+    """
+
+    segments = []
@@ -1,4 +1,15 @@
 class RegexFieldPattern(object):
     name = "Regex Field Pattern"
     regex = None
+    # Regex flags of the pattern (e.g. re.IGNORECASE), patterns are case
+    # sensitive by default
+    flags = 0
     strength = 0.0
+    # Optional function, called with the matched text, for validations
+    # that can't be expressed in RE2 (e.g. lookarounds)
+    validator = None
+    # Optional limits of the pattern, overriding the default ones (see
+    # pattern_registry.PatternBudget)
+    max_mem = None
+    max_matches = None
+    time_budget = None
@@ -4,7 +4,22 @@ class FieldType(object):
     text = ""
     patterns = []
     contexts = []
+    # Context words in all their forms (see context_table), set when the
+    # field type is created by the field rules
+    context_forms = frozenset()
+    # Column of the field type in the context similarities (see
+    # context_vectors), None if its context words have no vectors
+    context_column = None
+    # Number of words before and after a match which are its context
+    context_prefix_count = 5
+    context_suffix_count = 0
     should_check_checksum = False
+    # Document features needed for a match (see document_features)
+    required_features = []
+    min_digit_run = 0
+    # Name of the details of the results (see get_details), e.g.
+    # 'card-issuers', None if the field type has none
+    details_name = None
 
     def check_checksum(self):
         return False
@@ -14,3 +29,8 @@ class FieldType(object):
 
     def check_label(self):
         return False
+
+    def get_details(self):
+        """Get the details of the current text, None if it has none"""
+
+        return None
@@ -1,15 +1,81 @@
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_digit_pattern
+
+# Issuer networks, their IIN (BIN) prefixes and card number lengths
+ISSUER_RANGES = [
+    ('Visa', ['4'], [13, 16, 19]),
+    ('American Express', ['34', '37'], [15]),
+    ('Diners Club', ['300', '301', '302', '303', '304', '305', '3095', '36',
+                     '38', '39'], range(14, 20)),
+    ('JCB', [str(prefix) for prefix in range(3528, 3590)], range(16, 20)),
+    ('Mastercard', ['51', '52', '53', '54', '55'], [16]),
+    ('Maestro', ['50', '6304', '6759', '6761', '6762', '6763'],
+     range(12, 20)),
+    ('Dankort', ['5019'], [16]),
+    ('Discover', ['6011', '644', '645', '646', '647', '648', '649', '65'],
+     range(16, 20)),
+    ('UnionPay', ['62'], range(16, 20)),
+    ('InstaPayment', ['637', '638', '639'], [16]),
+    ('UATP', ['1'], [15])
+]
+
+
+def _build_issuer_trie(issuer_ranges):
+    """Build a trie of the prefixes, a node is a dictionary of digit to
+    child node, and None to the (network, lengths) of the prefix ending
+    at the node"""
+
+    trie = {}
+    for network, prefixes, lengths in issuer_ranges:
+        for prefix in prefixes:
+            node = trie
+            for digit in prefix:
+                node = node.setdefault(digit, {})
+            node[None] = (network, frozenset(lengths))
+    return trie
+
+
+ISSUER_TRIE = _build_issuer_trie(ISSUER_RANGES)
+
+
+def find_issuer(digits):
+    """Find the issuer network of a card number, by its longest issuer
+    prefix whose range has the number's length (e.g. an 18 digits number
+    starting with the Dankort prefix '5019' is a Maestro '50' one)
+
+    Args:
+      digits: card number, without separators
+
+    Returns:
+      network name, or None if no issuer range has this prefix and length
+    """
+
+    issuer = None
+    node = ISSUER_TRIE
+    for digit in digits:
+        node = node.get(digit)
+        if node is None:
+            break
+        if None in node and len(digits) in node[None][1]:
+            issuer = node[None][0]
+
+    return issuer
+
+
+def _has_issuer(text):
+    return find_issuer(text.replace('-', '').replace(' ', '')) is not None
 
 
 class CreditCard(field_type.FieldType):
     name = "CREDIT_CARD"
     should_check_checksum = True
+    details_name = "card-issuers"
     context = [
         "credit",
-        "card",
+        "credit card",
+        "card number",
         "visa",
         "mastercard",
-        # "american express" #TODO: add after adding keyphrase support
+        "american express",
         "amex",
         "discover",
         "jcb",
@@ -18,11 +84,21 @@ class CreditCard(field_type.FieldType):
         "instapayment"
     ]
 
+    min_digit_run = 4
+
     patterns = []
 
     # All credit cards - weak pattern is used, since credit cards has checksum
-    pattern = field_regex_pattern.RegexFieldPattern()
+    separator = field_digit_pattern.Separator('- ', optional=True)
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b((4\d{3})|(5[0-5]\d{2})|(6\d{3})|(1\d{3})|(3\d{3}))[- ]?(\d{3,4})[- ]?(\d{3,4})[- ]?(\d{3,5})\b'  # noqa: E501
+    pattern.segments = [[
+        (4, 4, ['4', '50', '51', '52', '53', '54', '55', '6', '1', '3']),
+        separator, (3, 4), separator, (3, 4), separator, (3, 5)
+    ]]
+    # Numbers out of the issuer ranges (e.g. order IDs) are dropped before
+    # the Luhn checksum
+    pattern.validator = _has_issuer
     pattern.name = 'All Credit Cards (weak)'
     pattern.strength = 0.3
     patterns.append(pattern)
@@ -45,4 +121,11 @@ class CreditCard(field_type.FieldType):
 
     def check_checksum(self):
         self.__sanitize_value()
-        return self.__luhn_checksum() == 0
+        return find_issuer(self.sanitized_value) is not None and \
+            self.__luhn_checksum() == 0
+
+    def get_details(self):
+        """The issuer network of the card number, e.g. 'Visa'"""
+
+        self.__sanitize_value()
+        return find_issuer(self.sanitized_value)
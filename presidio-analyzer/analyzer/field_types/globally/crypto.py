@@ -8,6 +8,8 @@ class Crypto(field_type.FieldType):
 
     should_check_checksum = True
 
+    min_digit_run = 1
+
     patterns = []
 
     pattern = field_regex_pattern.RegexFieldPattern()
@@ -1,5 +1,97 @@
 import tldextract
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_anchor_pattern, document_features
+from field_types.field_anchor_pattern import ALNUM_BYTES, WORD_BYTES
+
+LABEL_BYTES = ALNUM_BYTES | frozenset(b'-')
+DOT = ord('.')
+
+
+def _label_end(data, start, max_length):
+    """Find where a label starting at data[start] ends, alphanumeric at
+    both ends and followed by a '.'
+
+    Returns:
+      end offset (of the '.'), or None if there's no such label
+    """
+
+    end = field_anchor_pattern.run_end(data, start, LABEL_BYTES)
+    if start == end or end - start > max_length or end == len(data) or \
+            data[end] != DOT or data[start] not in ALNUM_BYTES or \
+            data[end - 1] not in ALNUM_BYTES:
+        return None
+    return end
+
+
+def _suffix_end(data, start):
+    """Find where the suffix starting at data[start] ends, either two
+    parts of 2 to 12 characters or a single one of 2 to 25 characters
+
+    Returns:
+      end offset, or None if there's no suffix
+    """
+
+    end = field_anchor_pattern.run_end(data, start, ALNUM_BYTES)
+    length = end - start
+    if 2 <= length <= 12 and end < len(data) and data[end] == DOT:
+        second_end = field_anchor_pattern.run_end(data, end + 1, ALNUM_BYTES)
+        if 2 <= second_end - end - 1 <= 12 and (
+                second_end == len(data)
+                or data[second_end] not in WORD_BYTES):
+            return second_end
+    if 2 <= length <= 25 and (end == len(data)
+                              or data[end] not in WORD_BYTES):
+        return end
+    return None
+
+
+def _match_domain(data, start):
+    """Match a domain starting at data[start], with three labels (the
+    last one being the suffix), or with two
+
+    Returns:
+      end offset, or None if there's no match
+    """
+
+    # Both forms start with a label
+    label_end = _label_end(data, start, 164)
+    if label_end is None:
+        return None
+
+    if label_end - start <= 88:
+        second_label_end = _label_end(data, label_end + 1, 75)
+        if second_label_end is not None:
+            end = _suffix_end(data, second_label_end + 1)
+            if end is not None:
+                return end
+
+    return _suffix_end(data, label_end + 1)
+
+
+def find_domains(data, should_stop=None):
+    """Find the domains around every '.' of the text"""
+
+    spans = []
+    position = 0
+    dot = data.find(b'.')
+    while dot != -1:
+        if should_stop is not None and should_stop():
+            break
+        # Every match starts with the label before its first '.'
+        label_start = field_anchor_pattern.run_start(
+            data, dot, LABEL_BYTES, position)
+        for start in range(label_start, dot):
+            if data[start] not in ALNUM_BYTES or \
+                    not field_anchor_pattern.is_word_boundary(data, start):
+                continue
+            end = _match_domain(data, start)
+            if end is not None:
+                spans.append((start, end))
+                position = end
+                break
+
+        dot = data.find(b'.', max(dot + 1, position))
+
+    return spans
 
 
 class Domain(field_type.FieldType):
@@ -7,10 +99,13 @@ class Domain(field_type.FieldType):
     should_check_checksum = True
     context = ["domain", "ip"]
 
+    required_features = [document_features.FEATURE_DOT]
+
     patterns = []
 
     # Basic pattern, since domain has a checksum function
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_anchor_pattern.AnchorFieldPattern()
+    pattern.finder = find_domains
     pattern.regex = r'\b(((([a-zA-Z0-9])|([a-zA-Z0-9][a-zA-Z0-9\-]{0,86}[a-zA-Z0-9]))\.(([a-zA-Z0-9])|([a-zA-Z0-9][a-zA-Z0-9\-]{0,73}[a-zA-Z0-9]))\.(([a-zA-Z0-9]{2,12}\.[a-zA-Z0-9]{2,12})|([a-zA-Z0-9]{2,25})))|((([a-zA-Z0-9])|([a-zA-Z0-9][a-zA-Z0-9\-]{0,162}[a-zA-Z0-9]))\.(([a-zA-Z0-9]{2,12}\.[a-zA-Z0-9]{2,12})|([a-zA-Z0-9]{2,25}))))\b'  # noqa: E501
     pattern.name = 'Domain ()'
     pattern.strength = 0.5
@@ -1,5 +1,63 @@
 import tldextract
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_anchor_pattern, document_features
+from field_types.field_anchor_pattern import WORD_BYTES
+
+# Characters of the local part, which can't start or end with a '.'
+LOCAL_BYTES = WORD_BYTES | frozenset(b"!#$%&'*+-/=?^_`{|}~.")
+DOMAIN_SEPARATOR_BYTES = frozenset(b'-.')
+AT = ord('@')
+DOT = ord('.')
+
+
+def _domain_end(data, start):
+    """Find where the domain part of an email starting at data[start]
+    ends, words separated by single '-' or '.', with at least one '.'
+
+    Returns:
+      end offset, or None if there's no such domain
+    """
+
+    end = start
+    has_dot = False
+    while end < len(data) and data[end] in WORD_BYTES:
+        end = field_anchor_pattern.run_end(data, end, WORD_BYTES)
+        if end + 1 < len(data) and data[end] in DOMAIN_SEPARATOR_BYTES \
+                and data[end + 1] in WORD_BYTES:
+            has_dot = has_dot or data[end] == DOT
+            end += 1
+        else:
+            break
+
+    return end if has_dot else None
+
+
+def find_emails(data, should_stop=None):
+    """Find the emails around every '@' of the text"""
+
+    spans = []
+    position = 0
+    at = data.find(b'@')
+    while at != -1:
+        if should_stop is not None and should_stop():
+            break
+        domain_end = None
+        if at > position and data[at - 1] != DOT:
+            domain_end = _domain_end(data, at + 1)
+
+        if domain_end is not None:
+            # The leftmost start on a word boundary
+            local_start = field_anchor_pattern.run_start(
+                data, at, LOCAL_BYTES, position)
+            for start in range(local_start, at):
+                if data[start] != DOT and \
+                        field_anchor_pattern.is_word_boundary(data, start):
+                    spans.append((start, domain_end))
+                    position = domain_end
+                    break
+
+        at = data.find(b'@', max(at + 1, position))
+
+    return spans
 
 
 class Email(field_type.FieldType):
@@ -7,9 +65,14 @@ class Email(field_type.FieldType):
     should_check_checksum = True
     context = ["email"]
 
+    required_features = [
+        document_features.FEATURE_AT, document_features.FEATURE_DOT
+    ]
+
     patterns = []
 
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_anchor_pattern.AnchorFieldPattern()
+    pattern.finder = find_emails
     pattern.regex = r"\b((([!#$%&'*+\-/=?^_`{|}~\w])|([!#$%&'*+\-/=?^_`{|}~\w][!#$%&'*+\-/=?^_`{|}~\.\w]{0,}[!#$%&'*+\-/=?^_`{|}~\w]))[@]\w+([-.]\w+)*\.\w+([-.]\w+)*)\b"  # noqa: E501
     pattern.name = 'Email (Medium)'
     pattern.strength = 0.5
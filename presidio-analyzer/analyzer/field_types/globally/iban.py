@@ -7,6 +7,8 @@ class Iban(field_type.FieldType):
     context = ["iban"]
     should_check_checksum = True
 
+    min_digit_run = 7
+
     patterns = []
 
     pattern = field_regex_pattern.RegexFieldPattern()
@@ -1,22 +1,163 @@
-from field_types import field_type, field_regex_pattern
+import bisect
+from field_types import field_type, field_anchor_pattern, document_features
+from field_types.field_anchor_pattern import WORD_BYTES
+
+DIGIT_BYTES = frozenset(b'0123456789')
+HEX_BYTES = DIGIT_BYTES | frozenset(b'abcdefABCDEF')
+HEX_COLON_BYTES = HEX_BYTES | frozenset(b':')
+DOT = ord('.')
+
+
+def _ipv4_end(data, start):
+    """Parse the IPv4 address starting at data[start], four decimal
+    octets (0 to 255) separated by dots
+
+    Returns:
+      end offset, or None if there's no address
+    """
+
+    end = start
+    for i in range(4):
+        if i > 0:
+            if end == len(data) or data[end] != DOT:
+                return None
+            end += 1
+        octet_end = field_anchor_pattern.run_end(data, end, DIGIT_BYTES)
+        if not 0 < octet_end - end <= 3 or int(data[end:octet_end]) > 255:
+            return None
+        end = octet_end
+
+    if end < len(data) and data[end] in WORD_BYTES:
+        return None
+    return end
+
+
+def _is_ipv6(candidate):
+    """Check if hextets and colons, optionally ending with an IPv4
+    address, are an IPv6 address
+
+    Args:
+      candidate: bytes of the address
+    """
+
+    # An IPv4 address takes the place of the last two hextets
+    ipv4_start = candidate.rfind(b':') + 1
+    if b'.' in candidate:
+        if _ipv4_end(candidate, ipv4_start) != len(candidate):
+            return False
+        candidate = candidate[:ipv4_start] + b'0:0'
+
+    # At most one '::' replaces one or more zero hextets
+    halves = candidate.split(b'::')
+    if len(halves) > 2:
+        return False
+    hextets = [
+        hextet for half in halves if half for hextet in half.split(b':')
+    ]
+
+    # Every hextet is at most 0xffff
+    if not all(0 < len(hextet) <= 4 for hextet in hextets):
+        return False
+
+    if len(halves) == 1:
+        return len(hextets) == 8
+
+    # The unspecified address is mostly '::' in code or prose, and so are
+    # hextets of letters only (e.g. 'add::' or the scope in 'DB::Add')
+    if not any(c in DIGIT_BYTES for hextet in hextets for c in hextet):
+        return False
+    return 0 < len(hextets) < 8
+
+
+def _find_ipv6(data, should_stop=None):
+    """Find the IPv6 addresses around every ':' of the text"""
+
+    spans = []
+    position = 0
+    colon = data.find(b':')
+    while colon != -1:
+        if should_stop is not None and should_stop():
+            break
+        start = field_anchor_pattern.run_start(data, colon, HEX_BYTES,
+                                               position)
+        end = field_anchor_pattern.run_end(data, colon, HEX_COLON_BYTES)
+        if end < len(data) and data[end] == DOT:
+            ipv4_end = _ipv4_end(data, data.rfind(b':', start, end) + 1)
+            if ipv4_end is not None:
+                end = ipv4_end
+
+        # Addresses aren't part of a word or of a dotted name
+        if (start == 0 or data[start - 1] not in WORD_BYTES
+                and data[start - 1] != DOT) and \
+                (end == len(data) or data[end] not in WORD_BYTES) and \
+                _is_ipv6(data[start:end]):
+            spans.append((start, end))
+
+        position = end
+        colon = data.find(b':', end)
+
+    return spans
+
+
+def _find_ipv4(data, should_stop=None):
+    """Find the IPv4 addresses around every '.' of the text"""
+
+    spans = []
+    position = 0
+    dot = data.find(b'.')
+    while dot != -1:
+        if should_stop is not None and should_stop():
+            break
+        # The address starts with the octet before its first '.'
+        start = field_anchor_pattern.run_start(data, dot, DIGIT_BYTES,
+                                               position)
+        end = None
+        if start < dot and \
+                field_anchor_pattern.is_word_boundary(data, start):
+            end = _ipv4_end(data, start)
+
+        if end is not None:
+            spans.append((start, end))
+            position = end
+            dot = data.find(b'.', end)
+        else:
+            dot = data.find(b'.', dot + 1)
+
+    return spans
+
+
+def find_ips(data, should_stop=None):
+    """Find the IPv4 and IPv6 addresses of the text, an IPv4 address
+    ending an IPv6 one is part of it"""
+
+    ipv6_spans = _find_ipv6(data, should_stop)
+    ipv6_ends = [end for _, end in ipv6_spans]
+
+    spans = list(ipv6_spans)
+    for start, end in _find_ipv4(data, should_stop):
+        i = bisect.bisect_right(ipv6_ends, start)
+        if i == len(ipv6_spans) or ipv6_spans[i][0] > start:
+            spans.append((start, end))
+
+    spans.sort()
+    return spans
 
 
 class Ip(field_type.FieldType):
     name = "IP_ADDRESS"
     context = ["ip", "ipv4", "ipv6"]
 
-    patterns = []
+    required_features = [
+        document_features.FEATURE_DOT | document_features.FEATURE_COLON
+    ]
 
-    pattern = field_regex_pattern.RegexFieldPattern()
-    pattern.regex = r'\b(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b'  # noqa: E501
-    pattern.name = 'IPv4'
-    pattern.strength = 0.6
-    patterns.append(pattern)
+    patterns = []
 
-    pattern = field_regex_pattern.RegexFieldPattern()
-    pattern.regex = r'\s*(?!.*::.*::)(?:(?!:)|:(?=:))(?:[0-9a-f]{0,4}(?:(?<=::)|(?<!::):)){6}(?:[0-9a-f]{0,4}(?:(?<=::)|(?<!::):)[0-9a-f]{0,4}(?:(?<=::)|(?<!:)|(?<=:)(?<!::):)|(?:25[0-4]|2[0-4]\d|1\d\d|[1-9]?\d)(?:\.(?:25[0-4]|2[0-4]\d|1\d\d|[1-9]?\d)){3})\s*'  # noqa: E501
-    pattern.name = 'IPv6'
+    # Addresses are found around their dots and colons, and their octets
+    # and hextets are parsed. IPv4 and IPv6 addresses are a single pattern,
+    # so that one doesn't hide the other
+    pattern = field_anchor_pattern.AnchorFieldPattern()
+    pattern.finder = find_ips
+    pattern.name = 'IPv4 / IPv6'
     pattern.strength = 0.6
     patterns.append(pattern)
-
-    patterns.sort(key=lambda p: p.strength, reverse=True)
@@ -1,35 +1,35 @@
 from field_types import field_type
 import re2 as re
 
+# Field type of every spacy entity label
+LABEL_FIELDS = {
+    'GPE': 'LOCATION',
+    'LOC': 'LOCATION',
+    'PERSON': 'PERSON',
+    'DATE': 'DATE_TIME',
+    'TIME': 'DATE_TIME',
+    'NORP': 'NRP'
+}
+
+NAME_REGEX = re.compile(r"^[a-zA-Z0-9-_'.() ]+$", re.IGNORECASE | re.UNICODE)
+GUID_REGEX = re.compile(
+    r"(\{){0,1}[0-9a-fA-F]{8}\-[0-9a-fA-F]{4}\-[0-9a-fA-F]{4}\-[0-9a-fA-F]{4}\-[0-9a-fA-F]{12}(\}){0,1}",  # noqa: E501
+    re.IGNORECASE | re.UNICODE)
+
 
 class Ner(field_type.FieldType):
     name = "ner"
     context = []
 
     def validate_result(self):
-        pattern = r"^[a-zA-Z0-9-_'.() ]+$"
-        guid_pattern = r"(\{){0,1}[0-9a-fA-F]{8}\-[0-9a-fA-F]{4}\-[0-9a-fA-F]{4}\-[0-9a-fA-F]{4}\-[0-9a-fA-F]{12}(\}){0,1}"  # noqa: E501
-        result = re.match(pattern, self.text, re.IGNORECASE | re.UNICODE)
+        result = NAME_REGEX.match(self.text)
         if result is not None:
             if len(self.text) > 16:
-                if re.match(guid_pattern, self.text,
-                            re.IGNORECASE | re.UNICODE) is not None:
+                if GUID_REGEX.match(self.text) is not None:
                     return False
             return True
 
         return False
 
     def check_label(self, label):
-        if self.name == "LOCATION" and (label == 'GPE' or label == 'LOC'):
-            return True
-
-        if self.name == "PERSON" and label == 'PERSON':
-            return True
-
-        if self.name == "DATE_TIME" and (label == 'DATE' or label == 'TIME'):
-            return True
-
-        if self.name == "NRP" and label == 'NORP':
-            return True
-
-        return False
+        return LABEL_FIELDS.get(label) == self.name
@@ -1,4 +1,4 @@
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_digit_pattern
 
 
 class UkNhs(field_type.FieldType):
@@ -9,10 +9,15 @@ class UkNhs(field_type.FieldType):
         "health authority"
     ]
 
+    # The pattern ends with 4 digits
+    min_digit_run = 4
+
     patterns = []
 
-    pattern = field_regex_pattern.RegexFieldPattern()
+    separator = field_digit_pattern.Separator('- ', optional=True)
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b([0-9]{3})[- ]?([0-9]{3})[- ]?([0-9]{4})\b'
+    pattern.segments = [[3, separator, 3, separator, 4]]
     pattern.name = 'NHS (medium)'
     pattern.strength = 0.5
     patterns.append(pattern)
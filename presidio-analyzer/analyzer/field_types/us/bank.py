@@ -1,12 +1,11 @@
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_digit_pattern
 
 
 class UsBank(field_type.FieldType):
     name = "US_BANK_NUMBER"
     context = [
-        "bank"
-        # TODO: change to "checking account" as part of keyphrase change
-        "checking",
+        "bank",
+        "checking account",
         "account",
         "account#",
         "acct",
@@ -14,11 +13,14 @@ class UsBank(field_type.FieldType):
         "debit"
     ]
 
+    min_digit_run = 8
+
     patterns = []
 
     # Weak pattern: all passport numbers are a weak match, e.g., 14019033
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b[0-9]{8,17}\b'
+    pattern.segments = [[(8, 17)]]
     pattern.name = 'Bank Account (weak)'
     pattern.strength = 0.05
     patterns.append(pattern)
@@ -1,102 +1,236 @@
-from field_types import field_type, field_regex_pattern
+import functools
+import re2 as re
+from field_types import field_type, field_regex_pattern, \
+    field_digit_pattern
+
+# Driver license formats per state, from
+# https://ntsi.com/drivers-license-format/
+# Every license number is a whole word, matching one of its state's
+# formats
+STATE_FORMATS = {
+    'AL': [r'[0-9]{1,7}'],
+    'AK': [r'[0-9]{1,7}'],
+    'AZ': [r'[A-Z][0-9]{8}', r'[0-9]{9}'],
+    'AR': [r'[0-9]{4,9}'],
+    'CA': [r'[A-Z][0-9]{7}'],
+    'CO': [r'[0-9]{9}', r'[A-Z][0-9]{3,6}', r'[A-Z]{2}[0-9]{2,5}'],
+    'CT': [r'[0-9]{9}'],
+    'DE': [r'[0-9]{1,7}'],
+    'DC': [r'[0-9]{7}', r'[0-9]{9}'],
+    'FL': [r'[A-Z][0-9]{1,12}'],
+    'GA': [r'[0-9]{7,9}'],
+    'HI': [r'[0-9]{9}', r'H[0-9]{8}'],
+    'ID': [r'[0-9]{9}', r'[A-Z]{2}[0-9]{6}[A-Z]'],
+    'IL': [r'[A-Z][0-9]{11,12}'],
+    'IN': [r'[A-Z][0-9]{9}', r'[0-9]{9,10}'],
+    'IA': [r'[0-9]{9}', r'[0-9]{3}[A-Z]{2}[0-9]{4}'],
+    'KS': [r'[A-Z][0-9][A-Z][0-9][A-Z]', r'[A-Z][0-9]{8}', r'[0-9]{9}'],
+    'KY': [r'[A-Z][0-9]{8}', r'[0-9]{9}'],
+    'LA': [r'[0-9]{9}'],
+    'ME': [r'[0-9]{7}', r'[0-9]{8}', r'[0-9]{8}[A-Z]'],
+    'MD': [r'[A-Z][0-9]{12}'],
+    'MA': [r'[A-Z][0-9]{8}', r'[0-9]{9}'],
+    'MI': [r'[A-Z][0-9]{12}', r'[A-Z][0-9]{10}'],
+    'MN': [r'[A-Z][0-9]{12}'],
+    'MS': [r'[0-9]{9}'],
+    'MO': [
+        r'[A-Z][0-9]{5,9}', r'[A-Z][0-9]{6}R', r'[0-9]{9}',
+        r'[0-9]{8}[A-Z]{2}', r'[0-9]{9}[A-Z]'
+    ],
+    'MT': [r'[0-9]{13,14}', r'[A-Z]{9}', r'[A-Z][0-9]{8}'],
+    'NE': [r'[A-Z][0-9]{6,8}'],
+    'NV': [r'[0-9]{9,10}', r'[0-9]{12}', r'X[0-9]{8}'],
+    'NH': [r'[0-9]{2}[A-Z]{3}[0-9]{5}'],
+    'NJ': [r'[A-Z][0-9]{14}'],
+    'NM': [r'[0-9]{8,9}'],
+    'NY': [
+        r'[A-Z][0-9]{7}', r'[A-Z][0-9]{18}', r'[0-9]{8,9}', r'[0-9]{16}',
+        r'[A-Z]{8}'
+    ],
+    'NC': [r'[0-9]{1,12}'],
+    'ND': [r'[A-Z]{3}[0-9]{6}', r'[0-9]{9}'],
+    'OH': [r'[A-Z][0-9]{4,8}', r'[A-Z]{2}[0-9]{3,7}', r'[0-9]{8}'],
+    'OK': [r'[A-Z][0-9]{9}', r'[0-9]{9}'],
+    'OR': [r'[0-9]{1,9}'],
+    'PA': [r'[0-9]{8}'],
+    'RI': [r'[0-9]{7}', r'V[0-9]{6}'],
+    'SC': [r'[0-9]{5,11}'],
+    'SD': [r'[0-9]{6,10}', r'[0-9]{12}'],
+    'TN': [r'[0-9]{7,9}'],
+    'TX': [r'[0-9]{7,8}'],
+    'UT': [r'[0-9]{4,10}'],
+    'VT': [r'[0-9]{8}', r'[0-9]{7}[A-Z]'],
+    'VA': [r'[A-Z][0-9]{9,11}', r'[0-9]{9}'],
+    # WA license numbers are relatively unique as they may include '*'
+    # chars, however they can also be 12 letters, which makes every 12
+    # letters word a match
+    'WA': [r'[A-Z][A-Z0-9*]{11}'],
+    'WV': [r'[0-9]{7}', r'[A-Z]{1,2}[0-9]{5,6}'],
+    'WI': [r'[A-Z][0-9]{13}'],
+    'WY': [r'[0-9]{9,10}']
+}
+
+# Kinds of formats, each one a pattern with its own strength
+KIND_DIGITS = 'digits'
+KIND_LETTERS = 'letters'
+KIND_ALPHANUMERIC = 'alphanumeric'
+KIND_ASTERISK = 'asterisk'
+
+CHAR_CLASS_REGEX = re.compile(r'\[[^\]]*\]|\{[^}]*\}')
+DIGITS_FORMAT_REGEX = re.compile(r'^\[0-9\]\{([0-9]+)(?:,([0-9]+))?\}$')
+
+
+def _format_kind(state_format):
+    if '*' in state_format:
+        return KIND_ASTERISK
+    has_digits = '0-9' in state_format
+    has_letters = 'A-Z' in state_format or \
+        CHAR_CLASS_REGEX.sub('', state_format) != ''
+    if has_digits and has_letters:
+        return KIND_ALPHANUMERIC
+    return KIND_DIGITS if has_digits else KIND_LETTERS
+
+
+def _tag_formats(state_formats):
+    """Map every distinct format to the states using it"""
+
+    formats = {}
+    for state, state_format_list in sorted(state_formats.items()):
+        for state_format in state_format_list:
+            formats.setdefault(state_format, []).append(state)
+    return formats
+
+
+FORMAT_STATES = _tag_formats(STATE_FORMATS)
+COMPILED_FORMATS = [(re.compile(r'(?:{})$'.format(state_format)), states)
+                    for state_format, states in FORMAT_STATES.items()]
+
+# Letters which formats spell out, rather than match as [A-Z]
+LITERAL_LETTERS = frozenset(''.join(
+    CHAR_CLASS_REGEX.sub('', state_format) for state_format in FORMAT_STATES))
+
+
+def _shape(text):
+    """The shape of a candidate: digits become '0', letters which aren't
+    spelled out by a format become 'A'. A shape matches the same formats
+    as the text it came from"""
+
+    return ''.join('0' if c.isdigit() else
+                   c if c in LITERAL_LETTERS or not c.isalpha() else 'A'
+                   for c in text)
+
+
+@functools.lru_cache(maxsize=1024)
+def _shape_states(shape):
+    states = set()
+    for compiled, format_states in COMPILED_FORMATS:
+        if compiled.match(shape):
+            states.update(format_states)
+    return tuple(sorted(states))
+
+
+def matching_states(text):
+    """Get the states whose driver license formats match text
+
+    Candidates are matched once per distinct shape (e.g. 'A0000000'), so
+    the many numbers of a document share a handful of lookups.
+
+    Returns:
+      sorted tuple of state codes, empty if no state matches
+    """
+
+    return _shape_states(_shape(text))
+
+
+def _contains_digit_or_asterisk(text):
+    return any(c.isdigit() or c == '*' for c in text)
+
+
+def _asterisk_kind_states(text):
+    if not _contains_digit_or_asterisk(text):
+        return ()
+    return matching_states(text)
+
+
+def _kind_regex(kind, extra_formats=()):
+    formats = [
+        state_format for state_format in FORMAT_STATES
+        if _format_kind(state_format) == kind
+    ]
+    return r'\b({})\b'.format('|'.join(formats + list(extra_formats)))
+
+
+def _digit_segments():
+    """Digit segments of the digits only formats, one alternative per
+    range of lengths"""
+
+    lengths = set()
+    for state_format in FORMAT_STATES:
+        if _format_kind(state_format) == KIND_DIGITS:
+            match = DIGITS_FORMAT_REGEX.match(state_format)
+            min_length = int(match.group(1))
+            max_length = int(match.group(2) or min_length)
+            lengths.update(range(min_length, max_length + 1))
+
+    segments = []
+    for length in sorted(lengths):
+        if segments and segments[-1][0][1] == length - 1:
+            segments[-1] = [(segments[-1][0][0], length)]
+        else:
+            segments.append([(length, length)])
+    return segments
 
 
 class UsDriverLicense(field_type.FieldType):
 
     name = "US_DRIVER_LICENSE"
+    details_name = "driver-license-states"
     context = [
-        "driver", "license", "permit", "id", "lic", "identification", "card",
-        "cards", "dl", "dls", "cdls", "id", "lic#"
+        "driver", "license", "permit", "id", "lic", "identification",
+        "identification card", "identification cards", "dl", "dls", "cdls",
+        "id", "lic#"
     ]
 
-    # List from https://ntsi.com/drivers-license-format/
-    # ---------------
+    # The formats of all the states, grouped by kind. Every hit is tagged
+    # with the states it matches (the validator), and a hit which matches
+    # no state (e.g. a 12 letters word isn't a WA license with a digit or
+    # '*') is dropped before it's scored
     patterns = []
 
-    # WA Driver License number is relatively unique as it also
-    # includes '*' chars.
-    # However it can also be 12 letters which makes every 12 letter'
-    # word a match. Therefore we split WA driver license
-    # regex: r'\b([A-Z][A-Z0-9*]{11})\b' into two regexes
-    # With different weights, one to indicate letters only and
-    # one to indicate at least one digit or one '*'
     pattern = field_regex_pattern.RegexFieldPattern()
-    pattern.regex = r'\b((?=.*\d)([A-Z][A-Z0-9*]{11})|(?=.*\*)([A-Z][A-Z0-9*]{11}))\b'  # noqa: E501
+    pattern.regex = _kind_regex(KIND_ASTERISK)
+    pattern.validator = _asterisk_kind_states
     pattern.name = 'Driver License - WA (weak) '
     pattern.strength = 0.4
     patterns.append(pattern)
 
     pattern = field_regex_pattern.RegexFieldPattern()
-    pattern.regex = r'\b([A-Z]{12})\b'
-    pattern.name = 'Driver License - WA (very weak) '
-    pattern.strength = 0.0
-    patterns.append(pattern)
-
-    pattern = field_regex_pattern.RegexFieldPattern()
-    pattern.regex = r'\b([A-Z][0-9]{3,6}|[A-Z][0-9]{5,9}|[A-Z][0-9]{6,8}|[A-Z][0-9]{4,8}|[A-Z][0-9]{9,11}|[A-Z]{1,2}[0-9]{5,6}|H[0-9]{8}|V[0-9]{6}|X[0-9]{8}|A-Z]{2}[0-9]{2,5}|[A-Z]{2}[0-9]{3,7}|[0-9]{2}[A-Z]{3}[0-9]{5,6}|[A-Z][0-9]{13,14}|[A-Z][0-9]{18}|[A-Z][0-9]{6}R|[A-Z][0-9]{9}|[A-Z][0-9]{1,12}|[0-9]{9}[A-Z]|[A-Z]{2}[0-9]{6}[A-Z]|[0-9]{8}[A-Z]{2}|[0-9]{3}[A-Z]{2}[0-9]{4}|[A-Z][0-9][A-Z][0-9][A-Z]|[0-9]{7,8}[A-Z])\b'  # noqa: E501
+    pattern.regex = _kind_regex(KIND_ALPHANUMERIC)
+    pattern.validator = matching_states
     pattern.name = 'Driver License - Alphanumeric (weak) '
     pattern.strength = 0.3
     patterns.append(pattern)
 
-    pattern = field_regex_pattern.RegexFieldPattern()
-    pattern.regex = r'\b([0-9]{1,9}|[0-9]{4,10}|[0-9]{6,10}|[0-9]{1,12}|[0-9]{12,14}|[0-9]{16})\b'  # noqa: E501
+    pattern = field_digit_pattern.DigitFieldPattern()
+    pattern.regex = _kind_regex(KIND_DIGITS)
+    pattern.segments = _digit_segments()
+    pattern.validator = matching_states
     pattern.name = 'Driver License - Digits (very weak)'
     pattern.strength = 0.05
     patterns.append(pattern)
+
+    # Letters only, including the 12 letters WA licenses, match too many
+    # words and only count with context
+    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern.regex = _kind_regex(KIND_LETTERS, [r'[A-Z]{12}'])
+    pattern.validator = matching_states
+    pattern.name = 'Driver License - Letters (very weak) '
+    pattern.strength = 0.0
+    patterns.append(pattern)
     patterns.sort(key=lambda p: p.strength, reverse=True)
-    '''
-    # Regex per state
-    regexes = {
-        'AL': r'^[0-9]{1,7}\b',
-        'AK': r'^[0-9]{1,7}\b',
-        'AZ': r'\b[A-Z][0-9]{8}\b|[0-9]{9}\b',
-        'AR': r'^[0-9]{4,9}\b',
-        'CA': r'\b[A-Z][0-9]{7}\b',
-        'CO': r'^[0-9]{9}\b|[A-Z][0-9]{3,6}\b|[A-Z]{2}[0-9]{2,5}\b',
-        'CT': r'^[0-9]{9}\b',
-        'DE': r'^[0-9]{1,7}\b',
-        'DC': r'^[0-9]{7}\b|[0-9]{9}\b',
-        'FL': r'\b[A-Z][0-9]{1,12}\b',
-        'GA': r'^[0-9]{7,9}\b',
-        'HI': r'^[0-9]{9}\b|H[0-9]{8}\b',
-        'ID': r'^[0-9]{9}\b|[A-Z]{2}[0-9]{6}[A-Z]\b',
-        'IL': r'\b[A-Z][0-9]{11,12}',
-        'IN': r'\b[A-Z][0-9]{9}\b|[0-9]{9,10}\b',
-        'IA': r'^[0-9]{9}\b|[0-9]{3}[A-Z]{2}[0-9]{4}\b',
-        'KS': r'\b[A-Z][0-9][A-Z][0-9][A-Z]\b|[A-Z][0-9]{8}\b|[0-9]{9}\b',
-        'KY': r'\b[A-Z][0-9]{8}\b|[0-9]{9}\b',
-        'LA': r'^[0-9]{9}\b',
-        'ME': r'^[0-9]{7}\b|[0-9]{8}\b|[0-9]{8}[A-Z]\b',
-        'MD': r'\b[A-Z][0-9]{12}\b',
-        'MA': r'\b[A-Z][0-9]{8}\b|[0-9]{9}\b',
-        'MI': r'\b[A-Z][0-9]{12}\b|[A-Z][0-9]{10}\b',
-        'MN': r'\b[A-Z][0-9]{12}\b',
-        'MS': r'^[0-9]{9}\b',
-        'MO': r'\b[A-Z][0-9]{5,9}\b|[A-Z][0-9]{6}R\b|[0-9]{9}\b|[0-9]{8}[A-Z]{2}\b|[0-9]{9}[A-Z]\b', # noqa: E501
-        'MT': r'^[0-9]{13,14}\b|[A-Z]{9}\b|[A-Z][0-9]{8}\b',
-        'NE': r'\b[A-Z][0-9]{6,8}\b',
-        'NV': r'^[0-9]{9,10}\b|[0-9]{12}\b|x[0-9]{8}\b',
-        'NH': r'^[0-9]{2}[A-Z]{3}[0-9]{5}b',
-        'NJ': r'\b[A-Z][0-9]{14}\b',
-        'NM': r'^[0-9]{8,9}\b',
-        'NY': r'\b[A-Z][0-9]{7}\b|[A-Z][0-9]{18}\b|[0-9]{8,9}\b|[0-9]{16}\b|[A-Z]{8}\b',
-        'NC': r'^[0-9]{1,12}\b',
-        'ND': r'\b[A-Z]{3}[0-9]{6}\b|[0-9]{9}\b',
-        'OH': r'\b[A-Z][0-9]{4,8}\b|[A-Z]{2}[0-9]{3,7}\b|[0-9]{8}\b',
-        'OK': r'\b[A-Z][0-9]{9}\b|[0-9]{9}\b',
-        'OR': r'^[0-9]{1,9}\b',
-        'PA': r'^[0-9]{8}\b',
-        'RI': r'^[0-9]{7}\b|v[0-9]{6}\b',
-        'SC': r'^[0-9]{5,11}\b',
-        'SD': r'^[0-9]{6,10}\b|[0-9]{12}',
-        'TN': r'^[0-9]{7,9}\b',
-        'TX': r'^[0-9]{7-8}\b',
-        'UT': r'^[0-9]{4,10}\b',
-        'VT': r'^[0-9]{8}\b|[0-9]{7}[A-Z]\b',
-        'VA': r'\b[A-Z][0-9]{9,11}\b|[0-9]{9}\b',
-        'WA': r'^[a-z*]{7}[0-9]{3}[0-9a-z]{2}\b',
-        'WV': r'^[0-9]{7}\b|[A-Z]{1,2}[0-9]{5,6}\b',
-        'WI': r'\b[A-Z][0-9]{13}\b',
-        'WY': r'^[0-9]{9-10}\b'
-    }
-    '''
+
+    def get_details(self):
+        """The states whose formats match the license number, e.g.
+        'CA,NY'"""
+
+        return ','.join(matching_states(self.text)) or None
@@ -1,4 +1,4 @@
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_digit_pattern
 
 
 class UsItin(field_type.FieldType):
@@ -7,22 +7,35 @@ class UsItin(field_type.FieldType):
         "individual", "taxpayer", "itin", "tax", "payer", "taxid", "tin"
     ]
 
+    # Every pattern ends with 4 digits
+    min_digit_run = 4
+
     patterns = []
 
-    pattern = field_regex_pattern.RegexFieldPattern()
+    # 9XX: area, (7[0-9]|8[0-8]|9[0-2]|9[4-9]): group
+    AREA = (3, 3, ['9'])
+    GROUP = (2, 2, ['7', '80', '81', '82', '83', '84', '85', '86', '87', '88',
+                    '90', '91', '92', '94', '95', '96', '97', '98', '99'])
+    SEPARATOR = field_digit_pattern.Separator('- ')
+
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'(\b(9\d{2})[- ]{1}((7[0-9]{1}|8[0-8]{1})|(9[0-2]{1})|(9[4-9]{1}))(\d{4})\b)|(\b(9\d{2})((7[0-9]{1}|8[0-8]{1})|(9[0-2]{1})|(9[4-9]{1}))[- ]{1}(\d{4})\b)'  # noqa: E501
+    pattern.segments = [[AREA, SEPARATOR, GROUP, 4],
+                        [AREA, GROUP, SEPARATOR, 4]]
     pattern.name = 'Itin (very weak)'
     pattern.strength = 0.05
     patterns.append(pattern)
 
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b(9\d{2})((7[0-9]{1}|8[0-8]{1})|(9[0-2]{1})|(9[4-9]{1}))(\d{4})\b'  # noqa: E501
+    pattern.segments = [[AREA, GROUP, 4]]
     pattern.name = 'Itin (weak)'
     pattern.strength = 0.3
     patterns.append(pattern)
 
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b(9\d{2})[- ]{1}((7[0-9]{1}|8[0-8]{1})|(9[0-2]{1})|(9[4-9]{1}))[- ]{1}(\d{4})\b'  # noqa: E501
+    pattern.segments = [[AREA, SEPARATOR, GROUP, SEPARATOR, 4]]
     pattern.name = 'Itin (medium)'
     pattern.strength = 0.5
     patterns.append(pattern)
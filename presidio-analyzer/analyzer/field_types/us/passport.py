@@ -1,18 +1,21 @@
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_digit_pattern
 
 
 class UsPassport(field_type.FieldType):
     name = "US_PASSPORT"
     context = [
-        "us", "united", "states", "passport", "number", "passport#", "travel",
-        "document"
+        "us", "united", "states", "passport", "passport number", "passport#",
+        "travel", "document"
     ]
 
+    min_digit_run = 9
+
     patterns = []
 
     # Weak pattern: all passport numbers are a weak match, e.g., 14019033
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'(\b[0-9]{9}\b)'
+    pattern.segments = [[9]]
     pattern.name = 'Passport (very weak)'
     pattern.strength = 0.05
     patterns.append(pattern)
@@ -1,9 +1,15 @@
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_regex_pattern, \
+    field_digit_pattern
 
 
 class Phone(field_type.FieldType):
     name = "PHONE_NUMBER"
-    context = ["phone", "number", "telephone", "cell", "mobile", "call"]
+    context = [
+        "phone", "phone number", "telephone", "cell", "mobile", "call"
+    ]
+    # Every pattern ends with 4 digits
+    min_digit_run = 4
+
     patterns = []
 
     # Strong pattern: e.g., (425) 882 8080, 425 882-8080, 425.882.8080
@@ -14,15 +20,22 @@ class Phone(field_type.FieldType):
     patterns.append(pattern)
 
     # Medium pattern: e.g., 425 8828080
-    pattern = field_regex_pattern.RegexFieldPattern()
+    separator = '-.' + field_digit_pattern.WHITESPACE
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b(\d{3}[-\.\s]\d{3}[-\.\s]??\d{4})\b'
+    pattern.segments = [[
+        3,
+        field_digit_pattern.Separator(separator), 3,
+        field_digit_pattern.Separator(separator, optional=True), 4
+    ]]
     pattern.name = 'Phone (medium)'
     pattern.strength = 0.5
     patterns.append(pattern)
 
     # Weak pattern: e.g., 4258828080
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'(\b\d{10}\b)'
+    pattern.segments = [[10]]
     pattern.name = 'Phone (weak)'
     pattern.strength = 0.05
     patterns.append(pattern)
@@ -1,4 +1,4 @@
-from field_types import field_type, field_regex_pattern
+from field_types import field_type, field_digit_pattern
 
 
 class UsSsn(field_type.FieldType):
@@ -6,7 +6,8 @@ class UsSsn(field_type.FieldType):
     context = [
         "social",
         "security",
-        # "sec", TODO: add keyphrase support in "social sec"
+        "social security",
+        "social sec",
         "ssn",
         "ssns",
         "ssn#",
@@ -14,23 +15,34 @@ class UsSsn(field_type.FieldType):
         "ssid"
     ]
 
+    # The context may follow the number, e.g. '078-05-1120 (ssn)'
+    context_suffix_count = 2
+
     # Master Regex: r'\b([0-9]{3})-?([0-9]{2})-?([0-9]{4})\b'
+    # Every pattern has a group of (at least) 4 digits
+    min_digit_run = 4
+
     patterns = []
 
-    pattern = field_regex_pattern.RegexFieldPattern()
+    DASH = field_digit_pattern.Separator('-')
+
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b(([0-9]{5})-([0-9]{4})|([0-9]{3})-([0-9]{6}))\b'
+    pattern.segments = [[5, DASH, 4], [3, DASH, 6]]
     pattern.name = 'SSN (very weak)'
     pattern.strength = 0.05
     patterns.append(pattern)
 
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b[0-9]{9}\b'
+    pattern.segments = [[9]]
     pattern.name = 'SSN (weak)'
     pattern.strength = 0.3
     patterns.append(pattern)
 
-    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern = field_digit_pattern.DigitFieldPattern()
     pattern.regex = r'\b([0-9]{3})-([0-9]{2})-([0-9]{4})\b'
+    pattern.segments = [[3, DASH, 2, DASH, 4]]
     pattern.name = 'SSN (medium)'
     pattern.strength = 0.5
     patterns.append(pattern)
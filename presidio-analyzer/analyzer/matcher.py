@@ -3,17 +3,24 @@ import logging
 import os
 import en_core_web_lg
 import common_pb2
+from spacy import about as spacy_about
+import document_tokens
 import tldextract
-from field_types import field_factory
+from field_types import document_features
 from field_types.globally import ner
-import re2 as re
+import field_rules
+import pattern_pack
+import pattern_registry
+import structured_input
 
 CONTEXT_SIMILARITY_THRESHOLD = 0.65
 CONTEXT_SIMILARITY_FACTOR = 0.35
 MIN_SCORE_WITH_CONTEXT_SIMILARITY = 0.6
 NER_STRENGTH = 0.85
-CONTEXT_PREFIX_COUNT = 5
-CONTEXT_SUFFIX_COUNT = 0
+NLP_BATCH_SIZE = 1000
+# nlp.pipe runs in several processes from spacy 2.2
+PIPE_SUPPORTS_N_PROCESS = tuple(
+    int(part) for part in spacy_about.__version__.split('.')[:2]) >= (2, 2)
 
 
 class Matcher(object):
@@ -37,55 +44,209 @@ class Matcher(object):
         self.logger.info("Loading NLP model...")
         self.nlp = en_core_web_lg.load(disable=['parser', 'tagger'])
 
-    def __context_to_keywords(self, context):
-        """Convert context text to relevant keywords
+        # Compile the patterns of all the field types once. Invalid patterns
+        # fail here rather than on the first request. In strict mode,
+        # patterns which RE2 can't compile fail as well
+        self.strict = os.environ.get("RE2_STRICT_MODE",
+                                     "false").lower() == "true"
+        self.budget = self.__create_pattern_budget()
+        # In the semantic context mode, context words are also scored by
+        # the similarity of their word vectors to the field types' context
+        self.semantic_context = os.environ.get(
+            "SEMANTIC_CONTEXT_MODE", "false").lower() == "true"
+        pack = None
+        pack_path = os.environ.get("PATTERN_PACK")
+        if pack_path:
+            pack = pattern_pack.PatternPack(pack_path)
+        self.load_pattern_pack(pack)
+
+    def load_pattern_pack(self, pack):
+        """Compile the field types of a pattern pack, and use them for the
+        next requests. Requests in progress keep their version of the field
+        types
 
         Args:
-           context: words prefix of specified pattern
+          pack: PatternPack, or None for the built in field types
+
+        Raises:
+          ValueError: if a pattern can't be compiled
         """
 
-        nlp_context = self.nlp(context)
+        self.logger.info("Compiling patterns...")
+        vocab = self.nlp.vocab if self.semantic_context else None
+        rules = field_rules.FieldRules(pack, self.strict, self.budget, vocab)
+        for line in rules.registry.report():
+            self.logger.info(line)
+        for line in rules.registry.audit():
+            self.logger.warning('Pattern falls back to the re module: %s',
+                                line)
+
+        # A single assignment, requests see either version
+        self.rules = rules
+        if pack is not None:
+            self.logger.info("Loaded pattern pack %s version %s", pack.path,
+                             pack.version)
+
+    def __create_pattern_budget(self):
+        """Create the default limits of the patterns from the environment"""
+
+        budget = pattern_registry.PatternBudget()
+
+        max_mem = os.environ.get("PATTERN_MAX_MEM")
+        if max_mem:
+            budget.max_mem = int(max_mem)
+        max_matches = os.environ.get("PATTERN_MAX_MATCHES")
+        if max_matches:
+            budget.max_matches = int(max_matches)
+        time_budget = os.environ.get("PATTERN_TIME_BUDGET_MS")
+        if time_budget:
+            budget.time_budget = int(time_budget) / 1000.0
+
+        return budget
+
+    def __context_to_keywords(self, context, phrases):
+        """Convert context tokens to relevant keywords
+
+        Args:
+           context: tokens around specified pattern
+           phrases: context phrases around specified pattern
+        """
 
-        # Remove punctuation, stop words and take lemma form and remove
-        # duplicates
-        keywords = list(
-            filter(
-                lambda k: not self.nlp.vocab[k.text].is_stop and not k.is_punct and k.lemma_ != '-PRON-' and k.lemma_ != 'be',  # noqa: E501
-                nlp_context))
-        keywords = list(set(map(lambda k: k.lemma_.lower(), keywords)))
+        # Context words are looked up by their lowercase text, in all the
+        # forms of the field types' context words (see context_table)
+        keywords = set(token.lower_ for token in context)
+        keywords.update(phrases)
 
         return keywords
 
-    def __calculate_context_similarity(self, context, field):
+    def __calculate_context_similarity(self, context_fields, field,
+                                       vector_similarity=0.0):
         """Context similarity is 1 if there's exact match between a keyword in
-           context and any keyword in field.context
+           context and any form of a keyword in field.context, otherwise the
+           similarity of their word vectors in the semantic context mode
 
         Args:
-          context: words prefix of specified pattern
+          context_fields: names of the field types the keywords around
+                          specified pattern are context words of
           field: current field type (pattern)
+          vector_similarity: similarity of the context keywords' vectors
+                             to the field type (see context_vectors)
         """
 
-        context_keywords = self.__context_to_keywords(context)
+        similarity = vector_similarity
+        if field.name in context_fields:
+            similarity = 1
 
-        # TODO: remove after supporting keyphrases (instead of keywords)
-        if 'card' in field.context:
-            field.context.remove('card')
-        if 'number' in field.context:
-            field.context.remove('number')
+        return similarity
 
-        similarity = 0.0
-        for context_keyword in context_keywords:
-            if context_keyword in field.context:
-                similarity = 1
-                break
+    def __get_context_fields(self, rules, tokens, field, start, end):
+        """Get the names of the field types the context keywords of a match
+        are context words of, a lookup of every keyword in the context
+        table, computed once per span and context window for all the field
+        types matching it
 
-        return similarity
+        Args:
+          rules: FieldRules of the request
+          tokens: DocumentTokens (or StructuredDocument) of the document to
+                  analyze
+          field: current field type (pattern)
+          start: match start offset
+          end: match end offset
+        """
+
+        span = (start, end, field.context_prefix_count,
+                field.context_suffix_count)
+        context_fields = tokens.context_fields.get(span)
+        if context_fields is None:
+            context_fields = frozenset().union(*map(
+                rules.context_table.fields_of,
+                self.__get_context_keywords(tokens, field, start, end)))
+            tokens.context_fields[span] = context_fields
+
+        return context_fields
+
+    def __get_context_keywords(self, tokens, field, start, end):
+        """Get the context keywords of a match, computed once per span and
+        context window for all the field types matching it. The keywords
+        before and after the match are extracted once per window size, so
+        field types with different windows share them (e.g. the prefix of
+        US_SSN, which has a suffix too)
+
+        Args:
+          tokens: DocumentTokens (or StructuredDocument) of the document to
+                  analyze
+          field: current field type (pattern)
+          start: match start offset
+          end: match end offset
+        """
+
+        span = (start, end, field.context_prefix_count,
+                field.context_suffix_count)
+        context_keywords = tokens.context_keywords.get(span)
+        if context_keywords is not None:
+            return context_keywords
 
-    def __calculate_score(self, doc, match_strength, field, start, end):
+        if isinstance(tokens, structured_input.StructuredDocument):
+            # The context of a value is its key, not the words around it
+            context_keywords = tokens.keywords_of(start, end)
+        else:
+            context_keywords = self.__get_prefix_keywords(
+                tokens, start, field.context_prefix_count) | \
+                self.__get_suffix_keywords(tokens, end,
+                                           field.context_suffix_count)
+        tokens.context_keywords[span] = context_keywords
+
+        return context_keywords
+
+    def __get_prefix_keywords(self, tokens, start, prefix_count):
+        """Get the keywords of the words before a match, computed once per
+        start offset and window size
+
+        Args:
+          tokens: DocumentTokens of the document to analyze
+          start: match start offset
+          prefix_count: number of context words before the match
+        """
+
+        key = (start, prefix_count)
+        keywords = tokens.prefix_keywords.get(key)
+        if keywords is None:
+            keywords = frozenset()
+            if prefix_count:
+                keywords = frozenset(
+                    self.__context_to_keywords(*self.__extract_prefix(
+                        tokens, start, prefix_count)))
+            tokens.prefix_keywords[key] = keywords
+        return keywords
+
+    def __get_suffix_keywords(self, tokens, end, suffix_count):
+        """Get the keywords of the words after a match, computed once per
+        end offset and window size
+
+        Args:
+          tokens: DocumentTokens of the document to analyze
+          end: match end offset
+          suffix_count: number of context words after the match
+        """
+
+        key = (end, suffix_count)
+        keywords = tokens.suffix_keywords.get(key)
+        if keywords is None:
+            keywords = frozenset()
+            if suffix_count:
+                keywords = frozenset(
+                    self.__context_to_keywords(*self.__extract_suffix(
+                        tokens, end, suffix_count)))
+            tokens.suffix_keywords[key] = keywords
+        return keywords
+
+    def __calculate_score(self, rules, tokens, match_strength, field, start,
+                          end):
         """Calculate score of match by context
 
         Args:
-          doc: spacy document to analyze
+          rules: FieldRules of the request
+          tokens: DocumentTokens of the document to analyze
           match_strength: Base score according to the pattern strength
           field: current field type (pattern)
           start: match start offset
@@ -100,44 +261,95 @@ class Matcher(object):
                 return 1.0
 
         score = match_strength
+        if not self.__uses_context(field, match_strength):
+            return min(score, 1)
 
         # Add context similarity
-        context = self.__extract_context(doc, start, end)
+        context_fields = self.__get_context_fields(rules, tokens, field,
+                                                   start, end)
+        vector_similarity = 0.0
+        similarities = tokens.context_similarities.get(
+            (start, end, field.context_prefix_count,
+             field.context_suffix_count))
+        if similarities is not None and field.context_column is not None:
+            vector_similarity = float(similarities[field.context_column])
         context_similarity = self.__calculate_context_similarity(
-            context, field)
+            context_fields, field, vector_similarity)
         if context_similarity >= CONTEXT_SIMILARITY_THRESHOLD:
             score += context_similarity * CONTEXT_SIMILARITY_FACTOR
             score = max(score, MIN_SCORE_WITH_CONTEXT_SIMILARITY)
 
         return min(score, 1)
 
-    def __create_result(self, doc, match_strength, field, start, end):
+    def __uses_context(self, field, match_strength):
+        """Check if the context of a match can change its score: the field
+        type has context words, a context window, and the score isn't the
+        highest already
+
+        Args:
+          field: current field type (pattern)
+          match_strength: Base score according to the pattern strength
+        """
+
+        if match_strength >= 1:
+            return False
+        if not field.context_prefix_count and not field.context_suffix_count:
+            return False
+        return bool(field.context_forms) or field.context_column is not None
+
+    def __get_max_score(self, field, match_strength):
+        """Get the best score a match of a pattern can get
+
+        Args:
+          field: current field type (pattern)
+          match_strength: Base score according to the pattern strength
+        """
+
+        if field.should_check_checksum:
+            return 1.0
+        if not self.__uses_context(field, match_strength):
+            return match_strength
+        return min(
+            max(match_strength + CONTEXT_SIMILARITY_FACTOR,
+                MIN_SCORE_WITH_CONTEXT_SIMILARITY), 1)
+
+    def __create_result(self, rules, tokens, match_strength, field, start,
+                        end, min_score=0.0):
         """Create analyze result
 
         Args:
-          doc: spacy document to analyze
+          rules: FieldRules of the request
+          tokens: DocumentTokens of the document to analyze
           match_strength: Base score according to the pattern strength
           field: current field type (pattern)
           start: match start offset
           end: match end offset
-        """
+          min_score: minimal score of the result, no result is created for
+                     a lower score
 
-        res = common_pb2.AnalyzeResult()
-        res.field.name = field.name
-        res.text = field.text
+        Returns:
+          AnalyzeResult, or None if its score is lower than min_score
+        """
 
         # check score
         calc_score_start_time = datetime.datetime.now()
-        if isinstance(field, type(ner.Ner())):
-            res.score = NER_STRENGTH
+        if isinstance(field, ner.Ner):
+            score = NER_STRENGTH
         else:
-            res.score = self.__calculate_score(doc, match_strength, field,
-                                               start, end)
+            score = self.__calculate_score(rules, tokens, match_strength,
+                                           field, start, end)
         calc_score_time = datetime.datetime.now() - calc_score_start_time
 
         self.logger.debug('--- calc_prob_time[{}]: {}.{} seconds'.format(
             field.name, calc_score_time.seconds, calc_score_time.microseconds))
 
+        if score < min_score:
+            return None
+
+        res = common_pb2.AnalyzeResult()
+        res.field.name = field.name
+        res.text = field.text
+        res.score = score
         res.location.start = start
         res.location.end = end
         res.location.length = end - start
@@ -146,67 +358,130 @@ class Matcher(object):
                           res.field, res.text, start, end, res.score)
         return res
 
-    def __extract_context(self, doc, start, end):
-        """Extract context for a specified match
+    def __score_context_vectors(self, context_vectors, tokens, field,
+                                spans):
+        """Score the context of the matches of a pattern against the context
+        words of all the field types, with a single matrix product
+        (semantic context mode). Spans already scored with the same context
+        window (e.g. for another field type) aren't scored again
+
+        Args:
+          context_vectors: ContextVectors of the field types
+          tokens: DocumentTokens of the document to analyze
+          field: current field type (pattern)
+          spans: (start, end) of the matches to score
+        """
+
+        windows = (field.context_prefix_count, field.context_suffix_count)
+        keys = sorted(
+            set(span + windows
+                for span in spans) - tokens.context_similarities.keys())
+        if not keys:
+            return
+
+        similarities = context_vectors.similarities([
+            self.__get_context_keywords(tokens, field, start, end)
+            for start, end, _, _ in keys
+        ])
+        tokens.context_similarities.update(zip(keys, similarities))
+
+    def __extract_prefix(self, tokens, start, prefix_count):
+        """Extract the context before a specified match
 
         Args:
-          doc: spacy document to analyze
+          tokens: DocumentTokens of the document to analyze
           start: match start offset
-          end: match end offset
+          prefix_count: number of context words before the match
+
+        Returns:
+          the context tokens, and the context phrases found in them
         """
 
-        prefix = doc.text[0:start].split()
-        suffix = doc.text[end + 1:].split()
-        context = ''
+        first, last = tokens.before(start, prefix_count)
+        context = tokens.words_of(first, last)
+
+        # A token running into the match (e.g. 'number:1234') is tokenized
+        # again, without the text of the match
+        if context and context[-1].idx + len(context[-1]) > start:
+            context[-1:] = self.nlp.tokenizer(
+                tokens.text[context[-1].idx:start])
+
+        return context, tokens.phrases_of(first, last)
+
+    def __extract_suffix(self, tokens, end, suffix_count):
+        """Extract the context after a specified match
+
+        Args:
+          tokens: DocumentTokens of the document to analyze
+          end: match end offset
+          suffix_count: number of context words after the match
 
-        context += ' '.join(
-            prefix[max(0,
-                       len(prefix) - CONTEXT_PREFIX_COUNT):len(prefix)])
-        context += ' '
-        context += ' '.join(suffix[0:min(CONTEXT_SUFFIX_COUNT, len(suffix))])
+        Returns:
+          the context tokens, and the context phrases found in them
+        """
 
-        return context
+        first, last = tokens.after(end, suffix_count)
+        return tokens.words_of(first, last), tokens.phrases_of(first, last)
 
-    def __check_pattern(self, doc, results, field):
+    def __check_pattern(self, rules, tokens, results, field, hits,
+                        min_score=0.0):
         """Check for specific pattern in text
 
         Args:
-          doc: spacy document to analyze
+          rules: FieldRules of the request
+          tokens: DocumentTokens of the document to analyze
           results: array containing the created results
           field: current field type (pattern)
+          hits: dictionary of pattern to its matches in the document
+          min_score: minimal score of the results
         """
 
+        # Offsets of the results of this field, to skip duplicates
+        result_starts = set()
+        result_ends = set()
+        for x in results:
+            if x.field.name == field.name:
+                result_starts.add(x.location.start)
+                result_ends.add(x.location.end)
+
         max_matched_strength = -1.0
         for pattern in field.patterns:
             if pattern.strength <= max_matched_strength:
                 break
+            # The patterns are sorted by strength, the next ones can't get
+            # min_score either
+            if self.__get_max_score(field, pattern.strength) < min_score:
+                break
             result_found = False
 
-            match_start_time = datetime.datetime.now()
-            matches = re.finditer(
-                pattern.regex,
-                doc.text,
-                flags=re.IGNORECASE | re.DOTALL | re.MULTILINE)
-            match_time = datetime.datetime.now() - match_start_time
-            self.logger.debug('--- match_time[{}]: {}.{} seconds'.format(
-                field.name, match_time.seconds, match_time.microseconds))
-
-            for match in matches:
-                start, end = match.span()
-                field.text = doc.text[start:end]
+            # Only the matches which are scored, once this pattern is
+            # reached (weaker patterns are skipped once one has results)
+            if rules.context_vectors is not None and \
+                    field.context_column is not None and \
+                    not field.should_check_checksum and \
+                    self.__uses_context(field, pattern.strength):
+                self.__score_context_vectors(
+                    rules.context_vectors, tokens, field, [
+                        (start, end) for start, end in hits[pattern]
+                        if start < end and not (
+                            len(field.patterns) > 1 and
+                            (start in result_starts or end in result_ends))
+                    ])
+
+            for start, end in hits[pattern]:
+                field.text = tokens.text[start:end]
 
                 # Skip empty results
                 if field.text == '':
                     continue
 
                 # Don't add duplicate
-                if len(field.patterns) > 1 and any(
-                    ((x.location.start == start) or (x.location.end == end))
-                        and ((x.field.name == field.name)) for x in results):
+                if len(field.patterns) > 1 and (start in result_starts
+                                                or end in result_ends):
                     continue
 
-                res = self.__create_result(doc, pattern.strength, field, start,
-                                           end)
+                res = self.__create_result(rules, tokens, pattern.strength,
+                                           field, start, end, min_score)
 
                 if res is None or res.score == 0:
                     continue
@@ -217,34 +492,166 @@ class Matcher(object):
                 #     continue
 
                 results.append(res)
+                result_starts.add(start)
+                result_ends.add(end)
                 result_found = True
 
             if result_found:
                 max_matched_strength = pattern.strength
 
-    def __check_ner(self, doc, results, field):
+    def __check_ner(self, rules, tokens, results, field, min_score=0.0):
         """Check for specific NER in text
 
         Args:
-          doc: spacy document to analyze
+          rules: FieldRules of the request
+          tokens: DocumentTokens of the document to analyze
           results: array containing the created results
           field: current field type (NER)
+          min_score: minimal score of the results
         """
 
-        for ent in doc.ents:
-            if field.check_label(ent.label_) is False:
-                continue
-            field.text = ent.text
+        if NER_STRENGTH < min_score:
+            return results
 
-            if field.validate_result():
-                res = self.__create_result(doc, NER_STRENGTH, field,
-                                           ent.start_char, ent.end_char)
+        for text, start, end in self.__get_entities(tokens).get(
+                field.name, []):
+            field.text = text
+            res = self.__create_result(rules, tokens, NER_STRENGTH, field,
+                                       start, end)
 
-                if res is not None:
-                    results.append(res)
+            if res is not None:
+                results.append(res)
 
         return results
 
+    def __get_entities(self, tokens):
+        """Get the valid entities of the document, by NER field type. The
+        entities are sorted into the field types, and validated, in a
+        single pass for all the NER field types of the request
+
+        Args:
+          tokens: DocumentTokens of the document to analyze
+
+        Returns:
+          dictionary of field type name to the (text, start, end) of its
+          entities
+        """
+
+        if tokens.entities is None:
+            entities = {}
+            validator = ner.Ner()
+            for ent in tokens.doc.ents:
+                name = ner.LABEL_FIELDS.get(ent.label_)
+                if name is None:
+                    continue
+
+                validator.text = ent.text
+                if validator.validate_result():
+                    entities.setdefault(name, []).append(
+                        (validator.text, ent.start_char, ent.end_char))
+            tokens.entities = entities
+
+        return tokens.entities
+
+    def __get_min_score(self, field_type):
+        """Get the minimal score of the results of a field type filter
+
+        Args:
+          field_type: FieldTypes filter, its minScore is a number string
+        """
+
+        if not field_type.minScore:
+            return 0.0
+        try:
+            return float(field_type.minScore)
+        except ValueError:
+            self.logger.warning('Invalid minScore %s of %s is ignored',
+                                field_type.minScore, field_type.name)
+            return 0.0
+
+    def __create_field(self, rules, field_type_string_filter,
+                       context_windows):
+        """Create a field type, with the context window of the request
+
+        Args:
+          rules: FieldRules of the request
+          field_type_string_filter: field type descriptor
+          context_windows: dictionary of field type to the (prefix,
+                           suffix) context window of the request
+        """
+
+        field = rules.create(field_type_string_filter)
+        window = context_windows.get(field_type_string_filter)
+        if field is not None and window is not None:
+            field.context_prefix_count, field.context_suffix_count = window
+        return field
+
+    def parse_context_windows(self, value):
+        """Parse the context windows of a request, e.g.
+        'US_SSN=5:2,US_BANK_NUMBER=3:0'. Invalid windows are ignored
+
+        Args:
+          value: comma separated field type=prefix:suffix, in words
+
+        Returns:
+          dictionary of field type to its (prefix, suffix) context window
+        """
+
+        context_windows = {}
+        for item in (value or '').split(','):
+            if not item.strip():
+                continue
+            try:
+                name, window = item.split('=')
+                prefix_count, suffix_count = window.split(':')
+                window = (int(prefix_count), int(suffix_count))
+                if min(window) < 0:
+                    raise ValueError(window)
+            except ValueError:
+                self.logger.warning('Invalid context window %s is ignored',
+                                    item)
+                continue
+            context_windows[name.strip()] = window
+
+        return context_windows
+
+    def __needs_ner(self, rules, field_type_string_filters):
+        """Check if NER field types (e.g. PERSON) are requested
+
+        Args:
+          rules: FieldRules of the request
+          field_type_string_filters: field type descriptors
+        """
+
+        return any(
+            isinstance(rules.create(field_type_string_filter), ner.Ner)
+            for field_type_string_filter in field_type_string_filters)
+
+    def __parse_structured_input(self, rules, input_format, text,
+                                 sanitized_text, field_type_string_filters):
+        """Parse a structured document (JSON or CSV) into its values. The
+        NLP pipeline runs only for the NER field types
+
+        Args:
+          rules: FieldRules of the request
+          input_format: 'json' or 'csv'
+          text: document text
+          sanitized_text: document text, without newlines
+          field_type_string_filters: field type descriptors
+
+        Raises:
+          ValueError: if the text isn't in the input format
+        """
+
+        leaves = structured_input.parse(input_format, text)
+
+        doc = None
+        if self.__needs_ner(rules, field_type_string_filters):
+            doc = self.nlp(sanitized_text)
+
+        return structured_input.StructuredDocument(sanitized_text, leaves,
+                                                   doc)
+
     def __sanitize_text(self, text):
         """Replace newline with whitespace to ease spacy analyze process
 
@@ -256,43 +663,52 @@ class Matcher(object):
         text = text.replace('\r', ' ')
         return text
 
-    def __analyze_field_type(self, doc, field_type_string_filter, results):
+    def __analyze_field_type(self, rules, tokens, field_type_string_filter,
+                             results, hits, min_score=0.0,
+                             context_windows=None):
         """Analyze specific field type (NER/Pattern)
 
         Args:
-          doc: spacy document to analyze
+          rules: FieldRules of the request
+          tokens: DocumentTokens of the document to analyze
           field_type_string_filter: field type descriptor
           results: array containing the created results
+          hits: dictionary of pattern to its matches in the document
+          min_score: minimal score of the results
+          context_windows: dictionary of field type to the (prefix,
+                           suffix) context window of the request
         """
 
-        current_field = field_factory.FieldFactory.create(
-            field_type_string_filter)
+        current_field = self.__create_field(rules, field_type_string_filter,
+                                            context_windows or {})
 
         if current_field is None:
             return
 
         # Check for ner field
         analyze_start_time = datetime.datetime.now()
-        if isinstance(current_field, type(ner.Ner())):
+        if isinstance(current_field, ner.Ner):
             current_field.name = field_type_string_filter
-            self.__check_ner(doc, results, current_field)
+            self.__check_ner(rules, tokens, results, current_field,
+                             min_score)
         else:
-            self.__check_pattern(doc, results, current_field)
+            self.__check_pattern(rules, tokens, results, current_field, hits,
+                                 min_score)
 
         analyze_time = datetime.datetime.now() - analyze_start_time
         self.logger.debug('--- analyze_time[{}]: {}.{} seconds'.format(
             field_type_string_filter, analyze_time.seconds,
             analyze_time.microseconds))
 
-    def __is_checksum_result(self, result):
+    def __is_checksum_result(self, rules, result):
         if result.score == 1.0:
-            result_field = field_factory.FieldFactory.create(result.field.name)
+            result_field = rules.create(result.field.name)
             return result_field.should_check_checksum
         return False
 
-    def __remove_checksum_duplicates(self, results):
+    def __remove_checksum_duplicates(self, rules, results):
         results_with_checksum = list(
-            filter(lambda r: self.__is_checksum_result(r), results))
+            filter(lambda r: self.__is_checksum_result(rules, r), results))
 
         # Remove matches of the same text, if there's a match with checksum and
         # score = 1
@@ -317,31 +733,265 @@ class Matcher(object):
 
         return filtered_results
 
-    def analyze_text(self, text, field_type_filters):
+    def analyze_text(self, text, field_type_filters, truncated=None,
+                     context_windows=None, input_format=None, details=None):
         """Analyze text.
 
         Args:
           text: text to analyze
           field_type_filters: filters array such as [{"name":PERSON"},
                                                      {"name": "LOCATION"}]
+          truncated: optional set, the names of the field types whose scan
+                     was truncated by the patterns' limits are added to it
+          context_windows: optional dictionary of field type to a (prefix,
+                           suffix) context window, in words, overriding the
+                           field type's window
+          input_format: optional structured input format, 'json' or 'csv'.
+                        The context of a value is its key or column name,
+                        and only values are matched
+          details: optional dictionary, the details of the results (e.g.
+                   the states of a driver license) are added to it, as a
+                   dictionary of result start offset to details, by their
+                   field type's details name
+
+        Raises:
+          ValueError: if the text isn't in the input format
+        """
+
+        if context_windows is None:
+            context_windows = {}
+
+        # The field types of the whole request, even if a new pattern pack
+        # is loaded meanwhile
+        rules = self.rules
+        field_type_string_filters, min_scores = self.__get_field_type_filters(
+            rules, field_type_filters)
+
+        sanitized_text = self.__sanitize_text(text)
+        field_type_string_filters = self.__filter_by_features(
+            rules, field_type_string_filters, sanitized_text)
+
+        if input_format:
+            tokens = self.__parse_structured_input(
+                rules, input_format, text, sanitized_text,
+                field_type_string_filters)
+        else:
+            # Only the NLP stages the field types need: the whole pipeline
+            # for NER field types, otherwise only the tokenizer, for the
+            # context of the matches which need it. The document isn't
+            # parsed at all if none does (e.g. checksum field types)
+            parse = self.nlp.make_doc
+            if self.__needs_ner(rules, field_type_string_filters):
+                parse = self.nlp
+            tokens = document_tokens.DocumentTokens(
+                parse, rules.context_table.phrase_trie, sanitized_text)
+
+        results = self.__analyze_tokens(rules, tokens,
+                                        field_type_string_filters,
+                                        min_scores, context_windows,
+                                        truncated)
+        if details is not None:
+            self.__add_details(rules, results, details)
+        return results
+
+    def __add_details(self, rules, results, details):
+        """Add the details of the results of the field types which have
+        some (see FieldType.get_details)
+
+        Args:
+          rules: FieldRules of the request
+          results: AnalyzeResults of the document
+          details: dictionary of details name to a dictionary of result
+                   start offset to details
+        """
+
+        fields = {}
+        for result in results:
+            name = result.field.name
+            if name not in fields:
+                fields[name] = rules.create(name)
+            field = fields[name]
+            if field is None or field.details_name is None:
+                continue
+
+            field.text = result.text
+            result_details = field.get_details()
+            if result_details is None:
+                continue
+            self.logger.debug("field: %s Span: '%s:%s' Details: %s", name,
+                              result.location.start, result.location.end,
+                              result_details)
+            details.setdefault(field.details_name,
+                               {})[result.location.start] = result_details
+
+    def analyze_texts(self,
+                      texts,
+                      field_type_filters,
+                      batch_size=NLP_BATCH_SIZE,
+                      n_process=1,
+                      context_windows=None):
+        """Analyze a stream of texts, with the same field types
+
+        The texts are parsed in batches (nlp.pipe), when the field types
+        need the NLP pipeline (NER field types). Otherwise every text is
+        only tokenized, if the context of its matches is needed.
+
+        Args:
+          texts: iterable of texts to analyze
+          field_type_filters: filters array such as [{"name":PERSON"},
+                                                     {"name": "LOCATION"}]
+          batch_size: number of texts of a batch of the NLP pipeline
+          n_process: number of processes of the NLP pipeline (spacy 2.2 or
+                     later)
+          context_windows: optional dictionary of field type to a (prefix,
+                           suffix) context window, in words, overriding the
+                           field type's window
+
+        Returns:
+          generator of the results of every text, in the order of the texts
+
+        Raises:
+          ValueError: if n_process isn't 1 and the installed spacy can't
+                      run the pipeline in several processes
+        """
+
+        if n_process != 1 and not PIPE_SUPPORTS_N_PROCESS:
+            raise ValueError(
+                'n_process={} needs spacy 2.2 or later, spacy {} is '
+                'installed'.format(n_process, spacy_about.__version__))
+        if context_windows is None:
+            context_windows = {}
+
+        return self.__analyze_texts(texts, field_type_filters, batch_size,
+                                    n_process, context_windows)
+
+    def __analyze_texts(self, texts, field_type_filters, batch_size,
+                        n_process, context_windows):
+        """Analyze a stream of texts (see analyze_texts)
+
+        Yields:
+          the results of every text, in the order of the texts
+        """
+
+        # The field types of all the texts, even if a new pattern pack is
+        # loaded meanwhile
+        rules = self.rules
+        field_type_string_filters, min_scores = self.__get_field_type_filters(
+            rules, field_type_filters)
+        sanitized_texts = (self.__sanitize_text(text) for text in texts)
+
+        if self.__needs_ner(rules, field_type_string_filters):
+            options = {'batch_size': batch_size}
+            if n_process != 1:
+                options['n_process'] = n_process
+            docs = self.nlp.pipe(sanitized_texts, **options)
+        else:
+            # Texts are tokenized on demand, like in analyze_text
+            docs = sanitized_texts
+
+        for doc in docs:
+            if isinstance(doc, str):
+                tokens = document_tokens.DocumentTokens(
+                    self.nlp.make_doc, rules.context_table.phrase_trie, doc)
+            else:
+                tokens = document_tokens.DocumentTokens(
+                    doc, rules.context_table.phrase_trie)
+
+            yield self.__analyze_tokens(
+                rules, tokens,
+                self.__filter_by_features(rules, field_type_string_filters,
+                                          tokens.text), min_scores,
+                context_windows)
+
+    def __get_field_type_filters(self, rules, field_type_filters):
+        """Get the field types of a request, and their minimal scores
+
+        Args:
+          rules: FieldRules of the request
+          field_type_filters: filters array, all the field types if empty
+
+        Returns:
+          field type descriptors, and a dictionary of field type to the
+          minimal score of its results
         """
 
-        results = []
         field_type_string_filters = []
+        min_scores = {}
 
         if field_type_filters is None or not field_type_filters:
-            field_type_string_filters = field_factory.types_refs
+            field_type_string_filters = rules.types_refs
         else:
             for field_type in field_type_filters:
                 field_type_string_filters.append(field_type.name)
+                min_scores[field_type.name] = self.__get_min_score(field_type)
 
-        sanitized_text = self.__sanitize_text(text)
-        doc = self.nlp(sanitized_text)
+        return field_type_string_filters, min_scores
+
+    def __filter_by_features(self, rules, field_type_string_filters,
+                             sanitized_text):
+        """Skip the field types which can't match the document
+
+        Args:
+          rules: FieldRules of the request
+          field_type_string_filters: field type descriptors
+          sanitized_text: document text
+        """
+
+        features = document_features.DocumentFeatures(sanitized_text)
+        return [
+            field_type_string_filter
+            for field_type_string_filter in field_type_string_filters
+            if features.can_match(rules.create(field_type_string_filter))
+        ]
+
+    def __analyze_tokens(self,
+                         rules,
+                         tokens,
+                         field_type_string_filters,
+                         min_scores,
+                         context_windows,
+                         truncated=None):
+        """Analyze a document
+
+        Args:
+          rules: FieldRules of the request
+          tokens: DocumentTokens (or StructuredDocument) of the document
+          field_type_string_filters: field type descriptors
+          min_scores: dictionary of field type to the minimal score of its
+                      results
+          context_windows: dictionary of field type to the (prefix,
+                           suffix) context window of the request
+          truncated: optional set, the names of the field types whose scan
+                     was truncated by the patterns' limits are added to it
+        """
+
+        results = []
+
+        # Scan the text once for the patterns of all the field types
+        scan_start_time = datetime.datetime.now()
+        hits = rules.scanner.scan(tokens.text, field_type_string_filters)
+        scan_time = datetime.datetime.now() - scan_start_time
+        self.logger.debug('--- scan_time: {}.{} seconds'.format(
+            scan_time.seconds, scan_time.microseconds))
+
+        if isinstance(tokens, structured_input.StructuredDocument):
+            tokens.remove_structure_hits(hits)
+
+        truncated_fields = set(
+            rules.registry.get(pattern).field_name
+            for pattern in hits.truncated)
+        for field_name in sorted(truncated_fields):
+            self.logger.warning('Scan of %s truncated by its limits',
+                                field_name)
+        if truncated is not None:
+            truncated.update(truncated_fields)
 
         for field_type_string_filter in field_type_string_filters:
-            self.__analyze_field_type(doc, field_type_string_filter, results)
+            self.__analyze_field_type(
+                rules, tokens, field_type_string_filter, results, hits,
+                min_scores.get(field_type_string_filter, 0.0), context_windows)
 
-        results = self.__remove_checksum_duplicates(results)
+        results = self.__remove_checksum_duplicates(rules, results)
         results.sort(key=lambda x: x.location.start, reverse=False)
 
         return results
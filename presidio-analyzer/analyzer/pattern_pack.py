@@ -0,0 +1,321 @@
+import json
+import logging
+import os
+import threading
+import re2 as re
+from field_types import field_factory, field_regex_pattern, field_type
+from field_types.globally import ner
+
+try:
+    import yaml
+    YAML_ERRORS = (yaml.YAMLError, )
+except ImportError:
+    yaml = None
+    YAML_ERRORS = ()
+
+PATTERN_FLAGS = {
+    'IGNORECASE': re.IGNORECASE,
+    'MULTILINE': re.MULTILINE,
+    'DOTALL': re.DOTALL
+}
+# Limits of a pattern: whether they're whole numbers, and their minimum
+PATTERN_LIMITS = {
+    'max_mem': (True, 1),
+    'max_matches': (True, 1),
+    'time_budget': (False, 0)
+}
+# Context windows of a field type, in words (see FieldType)
+CONTEXT_WINDOWS = ['context_prefix_count', 'context_suffix_count']
+
+
+def _check_number(value, description, integer=False, minimum=0,
+                  maximum=None):
+    """Check a number of a pack, booleans and strings aren't numbers
+
+    Args:
+      value: value of the pack
+      description: what the value is, for the error
+      integer: if the number must be a whole number
+      minimum: minimal value
+      maximum: optional maximal value
+
+    Raises:
+      ValueError: if the value isn't a number in range
+    """
+
+    kinds = (int, ) if integer else (int, float)
+    if not isinstance(value, kinds) or isinstance(value, bool) or \
+            value < minimum or (maximum is not None and value > maximum):
+        raise ValueError("{} must be a {} from {}{}".format(
+            description, 'whole number' if integer else 'number', minimum,
+            ' to {}'.format(maximum) if maximum is not None else ''))
+    return value
+
+
+class PatternPack(object):
+    """Field types and patterns defined in a JSON or YAML file
+
+    A pack overrides the patterns and context of the built in field types,
+    and may define new pattern field types. e.g.:
+
+    {
+      "version": "1.0",
+      "fields": [{
+        "name": "US_SSN",
+        "context": ["social", "security", "ssn"],
+        "min_digit_run": 4,
+        "context_prefix_count": 5,
+        "context_suffix_count": 2,
+        "patterns": [{
+          "name": "SSN (medium)",
+          "regex": "\\\\b([0-9]{3})-([0-9]{2})-([0-9]{4})\\\\b",
+          "strength": 0.5,
+          "flags": ["IGNORECASE"]
+        }]
+      }]
+    }
+    """
+
+    def __init__(self, path):
+        """Constructor
+        Load and validate a pack
+
+        Args:
+          path: path of the pack (.json, .yaml or .yml)
+
+        Raises:
+          ValueError: if the pack can't be read or is invalid
+        """
+
+        self.path = path
+        self.fields = {}
+
+        try:
+            with open(path, 'r') as pack_file:
+                if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+                    if yaml is None:
+                        raise ValueError(
+                            "PyYAML is required for YAML pattern packs")
+                    pack = yaml.safe_load(pack_file)
+                else:
+                    pack = json.load(pack_file)
+        except (IOError, ValueError, TypeError) + YAML_ERRORS as e:
+            raise ValueError("Can't load pattern pack {}: {}".format(path, e))
+
+        if not isinstance(pack, dict) or \
+                not isinstance(pack.get('fields'), list):
+            raise ValueError(
+                "Pattern pack {} must have a list of fields".format(path))
+
+        self.version = str(pack.get('version', ''))
+        for definition in pack['fields']:
+            self.__add_field(definition)
+
+    def __add_field(self, definition):
+        """Validate a field type definition of the pack
+
+        Args:
+          definition: field type definition
+        """
+
+        name = definition.get('name') if isinstance(definition,
+                                                    dict) else None
+        if not name:
+            raise ValueError("Pattern pack field without a name")
+        if name in self.fields:
+            raise ValueError("Pattern pack field {} is defined twice".format(
+                name))
+        if isinstance(field_factory.FieldFactory.create(name), ner.Ner):
+            raise ValueError(
+                "Pattern pack field {} is a NER field type".format(name))
+
+        context = definition.get('context')
+        if context is not None and (
+                not isinstance(context, list)
+                or not all(isinstance(word, str) for word in context)):
+            raise ValueError(
+                "Context of pattern pack field {} must be a list of words".
+                format(name))
+
+        windows = {}
+        for window in CONTEXT_WINDOWS:
+            count = definition.get(window)
+            if count is not None:
+                _check_number(count,
+                              "{} of pattern pack field {}".format(
+                                  window, name),
+                              integer=True)
+            windows[window] = count
+
+        min_digit_run = _check_number(
+            definition.get('min_digit_run', 0),
+            "min_digit_run of pattern pack field {}".format(name),
+            integer=True)
+
+        patterns = definition.get('patterns')
+        if patterns is not None:
+            if not isinstance(patterns, list):
+                raise ValueError(
+                    "Patterns of pattern pack field {} must be a list".format(
+                        name))
+            patterns = [
+                self.__create_pattern(name, pattern) for pattern in patterns
+            ]
+            patterns.sort(key=lambda p: p.strength, reverse=True)
+        elif field_factory.FieldFactory.create(name) is None:
+            raise ValueError(
+                "New pattern pack field {} has no patterns".format(name))
+
+        self.fields[name] = {
+            'context': tuple(context) if context is not None else None,
+            'patterns': patterns,
+            'min_digit_run': min_digit_run,
+            'windows': windows
+        }
+
+    def __create_pattern(self, field_name, definition):
+        """Create a pattern of the pack
+
+        Args:
+          field_name: name of the pattern's field type
+          definition: pattern definition
+        """
+
+        if not isinstance(definition, dict) or \
+                not isinstance(definition.get('regex'), str):
+            raise ValueError(
+                "Pattern of pattern pack field {} without a regex".format(
+                    field_name))
+
+        pattern = field_regex_pattern.RegexFieldPattern()
+        pattern.regex = definition['regex']
+        pattern.name = str(definition.get('name', pattern.regex))
+        pattern.strength = float(
+            _check_number(definition.get('strength', 0.0),
+                          "Strength of pattern {}".format(pattern.name),
+                          maximum=1))
+
+        flags = definition.get('flags', [])
+        if not isinstance(flags, list):
+            raise ValueError("Flags of pattern {} must be a list".format(
+                pattern.name))
+        for flag in flags:
+            if not isinstance(flag, str) or flag not in PATTERN_FLAGS:
+                raise ValueError("Unknown flag {} of pattern {}".format(
+                    flag, pattern.name))
+            pattern.flags |= PATTERN_FLAGS[flag]
+
+        for limit, (integer, minimum) in PATTERN_LIMITS.items():
+            if definition.get(limit) is not None:
+                setattr(
+                    pattern, limit,
+                    _check_number(definition[limit],
+                                  "{} of pattern {}".format(
+                                      limit, pattern.name), integer,
+                                  minimum))
+
+        return pattern
+
+    def types_refs(self):
+        """Get the names of all the field types, built in and new ones"""
+
+        return field_factory.types_refs | set(self.fields)
+
+    def create(self, name):
+        """Create a field type, with the pack's patterns and context
+
+        Args:
+          name: field type name
+        """
+
+        field = field_factory.FieldFactory.create(name)
+        definition = self.fields.get(name)
+        if definition is None:
+            return field
+
+        if field is None:
+            field = field_type.FieldType()
+            field.name = name
+            field.context = ()
+
+        if definition['context'] is not None:
+            field.context = definition['context']
+        for window, count in definition['windows'].items():
+            if count is not None:
+                setattr(field, window, count)
+
+        # The built in document features may not fit the pack's patterns
+        if definition['patterns'] is not None:
+            field.patterns = definition['patterns']
+            field.required_features = []
+            field.min_digit_run = definition['min_digit_run']
+
+        return field
+
+
+class PackWatcher(object):
+    """Watch a pattern pack and reload it when it changes"""
+
+    def __init__(self, path, on_change, interval=5.0):
+        """Constructor
+
+        Args:
+          path: path of the pattern pack
+          on_change: function called with the new PatternPack, it's called
+                     from the watcher's thread
+          interval: seconds between checks of the pack's file
+        """
+
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.logger = logging.getLogger(__name__)
+        self.modified_time = self.__get_modified_time()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def __get_modified_time(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def check(self):
+        """Reload the pack if its file was modified
+
+        Returns:
+          True if a new version of the pack was loaded
+        """
+
+        modified_time = self.__get_modified_time()
+        if modified_time is None or modified_time == self.modified_time:
+            return False
+        self.modified_time = modified_time
+
+        # A broken pack doesn't replace the current one, and doesn't stop
+        # the watcher
+        try:
+            pack = PatternPack(self.path)
+            self.on_change(pack)
+        except ValueError as e:
+            self.logger.error('Pattern pack not reloaded: %s', e)
+            return False
+        except Exception:
+            self.logger.exception('Pattern pack not reloaded')
+            return False
+
+        return True
+
+    def start(self):
+        """Check the pack periodically in a background thread"""
+
+        def watch():
+            while not self.stopped.wait(self.interval):
+                self.check()
+
+        self.thread = threading.Thread(target=watch, name='pack-watcher')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,206 @@
+import datetime
+import threading
+import re2 as re
+import digit_candidates
+from field_types import field_anchor_pattern, field_digit_pattern
+
+# Inline form of the regex flags a pattern may declare
+INLINE_FLAGS = [(re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's')]
+ENGINE_RE2 = 're2'
+ENGINE_RE = 're'
+ENGINE_DIGITS = 'digits'
+ENGINE_ANCHORS = 'anchors'
+# RE2's default memory budget
+DEFAULT_MAX_MEM = 8 << 20
+
+
+class PatternBudget(object):
+    """Default limits of the patterns, each pattern may override them"""
+
+    def __init__(self, max_mem=DEFAULT_MAX_MEM, max_matches=None,
+                 time_budget=None):
+        """Constructor
+
+        Args:
+          max_mem: memory (bytes) RE2 may use for the program of a pattern
+          max_matches: number of matches of a pattern in a document after
+                       which its scan is truncated, None for no limit
+          time_budget: seconds from the start of a document's scan after
+                       which the scan of a pattern is truncated, None for
+                       no limit. It's checked between matches, and
+                       between candidates of numeric and anchor patterns
+        """
+
+        self.max_mem = max_mem
+        self.max_matches = max_matches
+        self.time_budget = time_budget
+
+
+class CompiledPattern(object):
+    """A field pattern with its compiled regex"""
+
+    def __init__(self,
+                 field_name,
+                 pattern,
+                 compiled,
+                 compile_time,
+                 budget,
+                 segments=None):
+        self.field_name = field_name
+        self.pattern = pattern
+        self.compiled = compiled
+        self.compile_time = compile_time
+        self.segments = segments
+
+        # The pattern's own limits override the default ones
+        self.max_mem = _first_set(pattern.max_mem, budget.max_mem)
+        self.max_matches = _first_set(pattern.max_matches,
+                                      budget.max_matches)
+        self.time_budget = _first_set(pattern.time_budget,
+                                      budget.time_budget)
+
+        # Digit patterns are matched against the document's digit runs,
+        # anchor patterns around their anchors, and pyre2 silently compiles
+        # patterns RE2 doesn't support with re
+        if segments is not None:
+            self.engine = ENGINE_DIGITS
+        elif isinstance(pattern, field_anchor_pattern.AnchorFieldPattern):
+            self.engine = ENGINE_ANCHORS
+        elif isinstance(compiled, re.SREPattern):
+            self.engine = ENGINE_RE
+        else:
+            self.engine = ENGINE_RE2
+
+        # RE2's program size isn't exposed by pyre2, the regex length is
+        # reported instead
+        self.regex_length = len(pattern.regex or '')
+
+        # Number of scans done by the re module instead of RE2
+        self.fallback_count = 0
+        self.lock = threading.Lock()
+
+    def count_fallback(self):
+        """Count a scan of a pattern RE2 couldn't compile"""
+
+        with self.lock:
+            self.fallback_count += 1
+
+
+class PatternRegistry(object):
+    """Compile the patterns of all the field types once"""
+
+    def __init__(self, fields, strict=False, budget=None):
+        """Constructor
+        Compile every pattern of the given fields
+
+        Args:
+          fields: field types (pattern) to compile
+          strict: reject patterns which RE2 can't compile, instead of
+                  falling back to the re module
+          budget: PatternBudget with the default limits of the patterns
+
+        Raises:
+          ValueError: if a pattern can't be compiled
+        """
+
+        self.budget = budget or PatternBudget()
+        self.compiled_patterns = {}
+
+        for field in fields:
+            for pattern in field.patterns:
+                self.compiled_patterns[pattern] = self.__compile(
+                    field, pattern)
+
+        if strict and self.fallback_patterns():
+            raise ValueError(
+                "Patterns not supported by RE2 in strict mode: {}".format(
+                    ', '.join(self.audit())))
+
+    def __compile(self, field, pattern):
+        """Compile a single pattern
+
+        Args:
+          field: field type of the pattern
+          pattern: pattern to compile
+        """
+
+        compile_start_time = datetime.datetime.now()
+        max_mem = _first_set(pattern.max_mem, self.budget.max_mem)
+        segments = None
+        try:
+            compiled = None
+            if pattern.regex is not None or not isinstance(
+                    pattern, field_anchor_pattern.AnchorFieldPattern):
+                compiled = re.compile(pattern.regex, pattern.flags,
+                                      max_mem=max_mem)
+            if isinstance(pattern, field_digit_pattern.DigitFieldPattern):
+                segments = digit_candidates.compile_segments(
+                    pattern.segments)
+        except (re.error, TypeError, ValueError) as e:
+            raise ValueError("Invalid pattern '{}' of field {}: {}".format(
+                pattern.name, field.name, e))
+        compile_time = datetime.datetime.now() - compile_start_time
+
+        return CompiledPattern(field.name, pattern, compiled, compile_time,
+                               self.budget, segments)
+
+    def get(self, pattern):
+        """Get the compiled form of a pattern
+
+        Args:
+          pattern: field pattern
+        """
+
+        return self.compiled_patterns[pattern]
+
+    def fallback_patterns(self):
+        """Get the compiled patterns which fall back to the re module"""
+
+        return [
+            compiled_pattern
+            for compiled_pattern in self.compiled_patterns.values()
+            if compiled_pattern.engine == ENGINE_RE
+        ]
+
+    def audit(self):
+        """Describe the patterns which fall back to the re module, and how
+        many times each of them was scanned"""
+
+        return [
+            "{}: '{}' (fallbacks: {})".format(
+                compiled_pattern.field_name,
+                compiled_pattern.pattern.name.strip(),
+                compiled_pattern.fallback_count)
+            for compiled_pattern in self.fallback_patterns()
+        ]
+
+    def report(self):
+        """Describe how each pattern was compiled, one line per pattern"""
+
+        lines = []
+        for compiled_pattern in self.compiled_patterns.values():
+            lines.append(
+                "{}: '{}' engine: {} regex_length: {} compile_time: {:.6f} "
+                "seconds".format(
+                    compiled_pattern.field_name,
+                    compiled_pattern.pattern.name.strip(),
+                    compiled_pattern.engine, compiled_pattern.regex_length,
+                    compiled_pattern.compile_time.total_seconds()))
+
+        return lines
+
+
+def inline_regex(pattern):
+    """Get the regex of a pattern with its flags inlined, e.g. (?i:...)
+
+    Args:
+      pattern: field pattern
+    """
+
+    flags = ''.join(
+        char for flag, char in INLINE_FLAGS if pattern.flags & flag)
+    return '(?{}:{})'.format(flags, pattern.regex)
+
+
+def _first_set(value, default):
+    return default if value is None else value
@@ -0,0 +1,390 @@
+import bisect
+import time
+import re2 as re
+import digit_candidates
+import pattern_registry
+
+NON_ASCII_REGEX = re.compile(r'[^\x00-\x7f]')
+
+
+class ScanHits(dict):
+    """The matches of each pattern, and the patterns whose scan was
+    truncated by their limits"""
+
+    def __init__(self, patterns):
+        super(ScanHits, self).__init__(
+            (pattern, []) for pattern in patterns)
+        self.truncated = set()
+
+
+class PatternScanner(object):
+    """Scan a document once for the patterns of several field types"""
+
+    def __init__(self, fields, registry):
+        """Constructor
+        Combine the patterns of the given fields into a single RE2 program
+
+        Args:
+          fields: field types (pattern) to scan for
+          registry: PatternRegistry holding the compiled patterns
+        """
+
+        self.patterns = []
+        self.compiled_patterns = []
+        self.fallback_patterns = []
+        self.digit_patterns = []
+        self.anchor_patterns = []
+        self.validated_patterns = set()
+        regexes = {}
+
+        for field in fields:
+            for pattern in field.patterns:
+                self.patterns.append(pattern)
+                if pattern.validator is not None:
+                    self.validated_patterns.add(pattern)
+                compiled_pattern = registry.get(pattern)
+                self.compiled_patterns.append(compiled_pattern)
+
+                # Patterns which RE2 can't handle are compiled by the re
+                # module, and can't be part of the RE2 union
+                if compiled_pattern.engine == pattern_registry.ENGINE_RE:
+                    self.fallback_patterns.append(compiled_pattern)
+                    continue
+
+                # Numeric patterns share the document's digit runs
+                if compiled_pattern.engine == pattern_registry.ENGINE_DIGITS:
+                    self.digit_patterns.append(compiled_pattern)
+                    continue
+
+                # Anchor patterns have their own finder
+                if compiled_pattern.engine == pattern_registry.ENGINE_ANCHORS:
+                    self.anchor_patterns.append(compiled_pattern)
+                    continue
+
+                # Identical regexes (in different fields) are matched once.
+                # Each regex keeps its own flags in the union
+                regex = pattern_registry.inline_regex(pattern)
+                if regex not in regexes:
+                    regexes[regex] = (compiled_pattern.compiled, [])
+                regexes[regex][1].append(compiled_pattern)
+
+        self.regexes = list(regexes.values())
+        # Every regex is a group of the union, to tell which one matched
+        self.alternatives = ['({})'.format(regex) for regex in regexes]
+        # Unions of the regexes from an index on, compiled when needed.
+        # The unions of other subsets of the regexes (once some patterns
+        # are truncated) are only kept for the scan which needs them
+        self.unions = {}
+        self.union = None
+        if self.regexes:
+            self.union = self.__get_union(
+                tuple(range(len(self.regexes))), {})[0]
+
+    def __get_union(self, indices, scan_unions):
+        """Get the union of some of the regexes
+
+        Args:
+          indices: tuple of the indices of the regexes, in order
+          scan_unions: unions of the current scan
+
+        Returns:
+          the compiled union, and the group of every regex in it
+        """
+
+        union = self.unions.get(indices) or scan_unions.get(indices)
+        if union is None:
+            groups = []
+            group = 1
+            for i in indices:
+                groups.append(group)
+                group += self.regexes[i][0].groups + 1
+
+            # The union may use the memory of all its patterns
+            union = (re.compile(
+                '|'.join(self.alternatives[i] for i in indices),
+                max_mem=sum(compiled_pattern.max_mem
+                            for i in indices
+                            for compiled_pattern in self.regexes[i][1])),
+                     groups)
+            if indices == tuple(range(indices[0], len(self.regexes))):
+                self.unions[indices] = union
+            else:
+                scan_unions[indices] = union
+        return union
+
+    def scan(self, text, field_names=None):
+        """Find all the matches of the patterns in text
+
+        The union of the patterns is searched once over the text. Every
+        position it stops at is a position where at least one pattern
+        matches, and only there each pattern is tried (anchored). Every
+        pattern gets the same non overlapping matches finditer would have
+        returned for it. Numeric patterns aren't part of the union, they
+        are matched against the digit runs of the text, tokenized once.
+        Anchor patterns find their own matches around their anchors.
+        Matches rejected by the pattern's validator are dropped.
+
+        The scan of a pattern is truncated when it has more matches than
+        its max_matches, or when its time_budget (from the start of the
+        scan) is over, which is checked between matches (between
+        candidates for numeric and anchor patterns). A truncated pattern
+        keeps the matches found before it was stopped.
+
+        The union of all the patterns is compiled once, when only some of
+        the field types are scanned for, the matches of the others are
+        skipped.
+
+        Args:
+          text: document text
+          field_names: names of the field types to scan for, None for all
+                       the field types of the scanner
+
+        Returns:
+          ScanHits, dictionary of pattern to a list of (start, end) tuples
+        """
+
+        scan_start_time = time.monotonic()
+        hits = ScanHits(self.patterns)
+
+        def is_skipped(compiled_pattern):
+            return field_names is not None and \
+                compiled_pattern.field_name not in field_names
+
+        def is_over_budget(compiled_pattern):
+            return compiled_pattern.time_budget is not None and \
+                time.monotonic() - scan_start_time > \
+                compiled_pattern.time_budget
+
+        def stop_check(compiled_pattern):
+            if compiled_pattern.time_budget is None:
+                return None
+
+            def should_stop():
+                if is_over_budget(compiled_pattern):
+                    hits.truncated.add(compiled_pattern.pattern)
+                    return True
+                return False
+
+            return should_stop
+
+        def add_spans(compiled_pattern, spans):
+            pattern = compiled_pattern.pattern
+            if compiled_pattern.max_matches is not None and \
+                    len(spans) > compiled_pattern.max_matches:
+                spans = spans[:compiled_pattern.max_matches]
+                hits.truncated.add(pattern)
+            hits[pattern] = [(to_char_offset(start), to_char_offset(end))
+                             for start, end in spans]
+
+        # Encode once, instead of once per RE2 call
+        data = text.encode('utf-8')
+        to_char_offset = _char_offset_converter(text, data)
+
+        if field_names is not None:
+            field_names = set(field_names)
+
+        if self.digit_patterns:
+            runs = digit_candidates.DigitRuns(data)
+            for compiled_pattern in self.digit_patterns:
+                if is_skipped(compiled_pattern):
+                    continue
+                add_spans(
+                    compiled_pattern,
+                    digit_candidates.find_matches(
+                        runs, compiled_pattern.segments,
+                        stop_check(compiled_pattern)))
+
+        for compiled_pattern in self.anchor_patterns:
+            if is_skipped(compiled_pattern):
+                continue
+            add_spans(
+                compiled_pattern,
+                compiled_pattern.pattern.finder(data,
+                                                stop_check(compiled_pattern)))
+
+        if self.union is not None:
+            skipped = set(compiled_pattern.pattern
+                          for compiled_pattern in self.compiled_patterns
+                          if is_skipped(compiled_pattern))
+            self.__scan_union(data, to_char_offset, hits, scan_start_time,
+                              skipped)
+
+        for compiled_pattern in self.fallback_patterns:
+            if is_skipped(compiled_pattern):
+                continue
+            compiled_pattern.count_fallback()
+            pattern = compiled_pattern.pattern
+            for match in compiled_pattern.compiled.finditer(text):
+                if is_over_budget(compiled_pattern) or \
+                        len(hits[pattern]) == compiled_pattern.max_matches:
+                    hits.truncated.add(pattern)
+                    break
+                hits[pattern].append(match.span())
+
+        for pattern in self.validated_patterns:
+            hits[pattern] = [(start, end) for start, end in hits[pattern]
+                             if pattern.validator(text[start:end])]
+
+        return hits
+
+    def __scan_union(self, data, to_char_offset, hits, scan_start_time,
+                     skipped):
+        """Search the union of the patterns, and find the patterns matching
+        where it stops, until every pattern is done or truncated
+
+        The union prefers its first alternative matching at a position, so
+        the regexes before it don't match there, and its match is the
+        regex's own match. The next regexes matching there are found by
+        matching the union of the regexes after it at the same position,
+        so only the regexes which match are ever tried. The clock is read
+        once per stop, and once all the patterns of a regex are truncated
+        (or skipped) the scan goes on with the union of the other regexes.
+
+        Args:
+          data: document text encoded as UTF-8
+          to_char_offset: converter of offsets in data to offsets in text
+          hits: ScanHits to add the matches to
+          scan_start_time: time.monotonic() at the start of the scan
+          skipped: set of the patterns whose matches are skipped
+        """
+
+        def is_done(compiled_pattern):
+            return compiled_pattern.pattern in hits.truncated or \
+                compiled_pattern.pattern in skipped
+
+        if all(is_done(compiled_pattern)
+               for _, compiled_patterns in self.regexes
+               for compiled_pattern in compiled_patterns):
+            return
+
+        budgeted_patterns = [
+            compiled_pattern for _, compiled_patterns in self.regexes
+            for compiled_pattern in compiled_patterns
+            if compiled_pattern.time_budget is not None and
+            not is_done(compiled_pattern)
+        ]
+        next_positions = [0] * len(self.regexes)
+        # The union of all the regexes, even if some are skipped, until a
+        # pattern is truncated
+        active = tuple(range(len(self.regexes)))
+        scan_unions = {}
+        union = self.union
+        truncated_count = len(hits.truncated)
+
+        pos = 0
+        while pos <= len(data):
+            if budgeted_patterns:
+                elapsed = time.monotonic() - scan_start_time
+                for compiled_pattern in budgeted_patterns:
+                    if elapsed > compiled_pattern.time_budget:
+                        hits.truncated.add(compiled_pattern.pattern)
+                budgeted_patterns = [
+                    compiled_pattern for compiled_pattern in budgeted_patterns
+                    if compiled_pattern.pattern not in hits.truncated
+                ]
+
+            # Drop the regexes whose patterns are all done
+            if len(hits.truncated) != truncated_count:
+                truncated_count = len(hits.truncated)
+                remaining = tuple(
+                    i for i in active
+                    if not all(map(is_done, self.regexes[i][1])))
+                if not remaining:
+                    break
+                if remaining != active:
+                    active = remaining
+                    union = self.__get_union(active, scan_unions)[0]
+
+            union_match = union.search(data, pos)
+            if union_match is None:
+                break
+            match_start = union_match.start()
+
+            first = 0
+            match = union_match
+            groups = self.__get_union(active, scan_unions)[1]
+            while match is not None:
+                first += _matched_alternative(match, groups)
+                i = active[first]
+                first += 1
+                next_match = None
+                if first < len(active):
+                    compiled_union, groups = self.__get_union(
+                        active[first:], scan_unions)
+                    next_match = compiled_union.match(data, match_start)
+
+                if match_start >= next_positions[i]:
+                    self.__add_match(self.regexes[i][1], match.span(),
+                                     to_char_offset, hits, skipped)
+                    start, end = match.span()
+                    next_positions[i] = end if end > start else end + 1
+
+                match = next_match
+
+            pos = match_start + 1
+
+    def __add_match(self, compiled_patterns, span, to_char_offset, hits,
+                    skipped):
+        """Add a match of a regex to its patterns which aren't truncated or
+        skipped
+
+        Args:
+          compiled_patterns: the patterns of the regex
+          span: (start, end) of the match in data
+          to_char_offset: converter of offsets in data to offsets in text
+          hits: ScanHits to add the match to
+          skipped: set of the patterns whose matches are skipped
+        """
+
+        span = (to_char_offset(span[0]), to_char_offset(span[1]))
+        for compiled_pattern in compiled_patterns:
+            pattern = compiled_pattern.pattern
+            if pattern in hits.truncated or pattern in skipped:
+                continue
+            if len(hits[pattern]) == compiled_pattern.max_matches:
+                hits.truncated.add(pattern)
+                continue
+            hits[pattern].append(span)
+
+
+def _matched_alternative(match, groups):
+    """Get the index of the alternative of a union which matched
+
+    Args:
+      match: match of the union
+      groups: the group of every alternative in the union
+    """
+
+    values = match.groups()
+    for alternative, group in enumerate(groups):
+        if values[group - 1] is not None:
+            return alternative
+
+
+def _char_offset_converter(text, data):
+    """Return a function converting UTF-8 offsets in data to offsets in text
+
+    Args:
+      text: document text
+      data: text encoded as UTF-8
+    """
+
+    if len(data) == len(text):
+        return lambda offset: offset
+
+    # Byte offsets at which a multi-byte character ends, and the number of
+    # extra bytes up to (and including) that character
+    ends = []
+    extra_bytes = []
+    extra = 0
+    for match in NON_ASCII_REGEX.finditer(text):
+        size = len(match.group().encode('utf-8'))
+        extra += size - 1
+        ends.append(match.end() + extra)
+        extra_bytes.append(extra)
+
+    def to_char_offset(offset):
+        i = bisect.bisect_right(ends, offset)
+        return offset - (extra_bytes[i - 1] if i else 0)
+
+    return to_char_offset
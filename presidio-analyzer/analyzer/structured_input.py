@@ -0,0 +1,339 @@
+import bisect
+import functools
+import json.decoder
+import json.scanner
+import re2 as re
+
+# Input formats of analyze_text, besides free text
+INPUT_JSON = 'json'
+INPUT_CSV = 'csv'
+
+# The context of a value is its key and the key of its parent (e.g.
+# {"ssn": {"value": "078-05-1120"}}), or its column name
+CONTEXT_KEY_COUNT = 2
+# The string value of a label key is the context of the value of its
+# labeled key, in the same object (e.g. {"system": "phone", "value":
+# "555-780-8673"}), if it's short enough
+LABEL_KEY = 'system'
+LABELED_KEY = 'value'
+MAX_LABEL_LENGTH = 32
+
+CAMEL_CASE_REGEX = re.compile(r'([a-z0-9])([A-Z])')
+KEY_SEPARATOR_REGEX = re.compile(r'[^a-z0-9#]+')
+CSV_CELL_REGEX = re.compile(r'"(?:[^"]|"")*"|[^,\r\n]*')
+
+
+@functools.lru_cache(maxsize=4096)
+def key_keywords(key):
+    """Get the context keywords of a key or a column name: its lowercase
+    words (e.g. 'card_number', 'cardNumber' are 'card' and 'number'), and
+    their phrases ('card number')
+
+    Args:
+      key: key or column name
+    """
+
+    words = [
+        word for word in KEY_SEPARATOR_REGEX.split(
+            CAMEL_CASE_REGEX.sub(r'\1 \2', key).lower()) if word
+    ]
+
+    keywords = set()
+    for first in range(len(words)):
+        for last in range(first + 1, len(words) + 1):
+            keywords.add(' '.join(words[first:last]))
+    return frozenset(keywords)
+
+
+def _skip_whitespace(text, idx):
+    return json.decoder.WHITESPACE.match(text, idx).end()
+
+
+class _JsonContainer(object):
+    """An object or array of a JSON document, while it's walked"""
+
+    def __init__(self, is_object, keys):
+        self.is_object = is_object
+        self.closing = '}' if is_object else ']'
+        # Context keys of the container, and of its current member
+        self.keys = keys
+        self.member_keys = keys
+        self.key = None
+        # Index in leaves of the first value of the current member
+        self.first_leaf = None
+        # The label of the object, and the index of its labeled value in
+        # leaves
+        self.label = None
+        self.labeled = None
+
+
+def _start_member(text, idx, container, leaves):
+    """Parse the key of an object's member
+
+    Returns:
+      offset of the member's value
+    """
+
+    if text[idx:idx + 1] != '"':
+        raise ValueError('Expecting a key at offset {}'.format(idx))
+    key, idx = json.decoder.scanstring(text, idx + 1)
+    idx = _skip_whitespace(text, idx)
+    if text[idx:idx + 1] != ':':
+        raise ValueError("Expecting ':' at offset {}".format(idx))
+    idx = _skip_whitespace(text, idx + 1)
+
+    if key == LABEL_KEY and text[idx:idx + 1] == '"':
+        container.label = json.decoder.scanstring(text, idx + 1)[0]
+    container.key = key
+    container.member_keys = (container.keys + (key, ))[-CONTEXT_KEY_COUNT:]
+    container.first_leaf = len(leaves)
+    return idx
+
+
+def _scalar_end(text, idx, keys, leaves):
+    """Parse a string, number or literal value, adding strings and numbers
+    to leaves
+
+    Returns:
+      offset of the end of the value
+    """
+
+    if text[idx:idx + 1] == '"':
+        end = json.decoder.scanstring(text, idx + 1)[1]
+        leaves.append((idx + 1, end - 1, keys))
+        return end
+
+    match = json.scanner.NUMBER_RE.match(text, idx)
+    if match is not None:
+        leaves.append((idx, match.end(), keys))
+        return match.end()
+
+    for literal in ('true', 'false', 'null'):
+        if text.startswith(literal, idx):
+            return idx + len(literal)
+
+    raise ValueError('Expecting a value at offset {}'.format(idx))
+
+
+def parse_json(text):
+    """Get the string and number values of a JSON document, with their keys
+
+    The document is walked with an explicit stack of the objects and
+    arrays around the current value, so deeply nested documents can't
+    exhaust the recursion limit.
+
+    Args:
+      text: JSON document
+
+    Returns:
+      list of (start, end, keys) of every value, by offset
+
+    Raises:
+      ValueError: if text isn't a JSON document
+    """
+
+    leaves = []
+    stack = []
+    keys = ()
+    idx = _skip_whitespace(text, 0)
+    while True:
+        char = text[idx:idx + 1]
+        if char in ('{', '['):
+            container = _JsonContainer(char == '{', keys)
+            idx = _skip_whitespace(text, idx + 1)
+            if text[idx:idx + 1] != container.closing:
+                stack.append(container)
+                if container.is_object:
+                    idx = _start_member(text, idx, container, leaves)
+                keys = container.member_keys
+                continue
+            idx += 1
+            is_scalar = False
+        else:
+            idx = _scalar_end(text, idx, keys, leaves)
+            is_scalar = True
+
+        # Close the objects and arrays ending after the value, up to the
+        # next value
+        while stack:
+            container = stack[-1]
+            if container.key == LABELED_KEY and is_scalar and \
+                    len(leaves) > container.first_leaf:
+                container.labeled = container.first_leaf
+
+            idx = _skip_whitespace(text, idx)
+            if text[idx:idx + 1] == container.closing:
+                stack.pop()
+                idx += 1
+                is_scalar = False
+                label = container.label
+                if label and len(label) <= MAX_LABEL_LENGTH and \
+                        container.labeled is not None:
+                    start, end, value_keys = leaves[container.labeled]
+                    leaves[container.labeled] = (start, end,
+                                                 value_keys + (label, ))
+                continue
+
+            if text[idx:idx + 1] != ',':
+                raise ValueError("Expecting ',' at offset {}".format(idx))
+            idx = _skip_whitespace(text, idx + 1)
+            if container.is_object:
+                idx = _start_member(text, idx, container, leaves)
+            keys = container.member_keys
+            break
+
+        if not stack:
+            break
+
+    if _skip_whitespace(text, idx) != len(text):
+        raise ValueError('Extra data at offset {}'.format(idx))
+    return leaves
+
+
+def parse_csv(text):
+    """Get the cells of a CSV document, with their column names. The first
+    row is the header
+
+    Args:
+      text: CSV document, comma separated
+
+    Returns:
+      list of (start, end, keys) of every cell, by offset
+
+    Raises:
+      ValueError: if a quoted cell isn't followed by a separator
+    """
+
+    leaves = []
+    header = None
+    row = []
+    idx = 0
+    while True:
+        match = CSV_CELL_REGEX.match(text, idx)
+        start, idx = match.start(), match.end()
+        if text[start:start + 1] == '"':
+            row.append((start + 1, idx - 1))
+        else:
+            row.append((start, idx))
+
+        separator = text[idx:idx + 1]
+        if separator == ',':
+            idx += 1
+            continue
+        if separator not in ('', '\r', '\n'):
+            raise ValueError('Expecting a separator at offset {}'.format(idx))
+
+        if header is None:
+            header = [text[start:end].replace('""', '"') for start, end in row]
+        else:
+            for column, (start, end) in enumerate(row):
+                keys = (header[column], ) if column < len(header) else ()
+                leaves.append((start, end, keys))
+        row = []
+
+        if separator == '':
+            return leaves
+        idx += 1
+        if separator == '\r' and text[idx:idx + 1] == '\n':
+            idx += 1
+        if idx == len(text):
+            return leaves
+
+
+PARSERS = {INPUT_JSON: parse_json, INPUT_CSV: parse_csv}
+
+
+def parse(input_format, text):
+    """Get the values of a structured document, with their keys
+
+    Args:
+      input_format: INPUT_JSON or INPUT_CSV
+      text: document
+
+    Raises:
+      ValueError: if the format is unknown, or text isn't in this format
+    """
+
+    parser = PARSERS.get(input_format)
+    if parser is None:
+        raise ValueError('Unknown input format {}'.format(input_format))
+    return parser(text)
+
+
+class StructuredDocument(object):
+    """The values of a structured document (JSON records, CSV rows), by
+    their offsets
+
+    The context of a match is the keywords of the key or column name of the
+    value it's in, computed once per key, so the context of structured
+    documents is never extracted from tokens (see DocumentTokens).
+    """
+
+    def __init__(self, text, leaves, doc=None):
+        """Constructor
+
+        Args:
+          text: document text
+          leaves: (start, end, keys) of every value, by offset
+          doc: optional spacy document, for NER field types
+        """
+
+        self.text = text
+        self.doc = doc
+        self.leaves = leaves
+        self.starts = [leaf[0] for leaf in leaves]
+        # Context keywords of every span (filled by the matcher)
+        self.context_keywords = {}
+        # Names of the field types the context keywords of every span are
+        # context words of (filled by the matcher)
+        self.context_fields = {}
+        # Context similarities of every span to the field types, in the
+        # semantic context mode (see context_vectors)
+        self.context_similarities = {}
+        # Valid entities of every NER field type (filled by the matcher)
+        self.entities = None
+
+    def leaf_of(self, start, end):
+        """Get the value (start, end, keys) containing a span, None if the
+        span isn't within a single value
+
+        Args:
+          start: start offset
+          end: end offset
+        """
+
+        i = bisect.bisect_right(self.starts, start) - 1
+        if i < 0 or self.leaves[i][1] < end:
+            return None
+        return self.leaves[i]
+
+    def keywords_of(self, start, end):
+        """Get the context keywords of a span, the keywords of its keys
+
+        Args:
+          start: start offset
+          end: end offset
+        """
+
+        leaf = self.leaf_of(start, end)
+        if leaf is None:
+            return frozenset()
+
+        keywords = set()
+        for key in leaf[2]:
+            keywords.update(key_keywords(key))
+        return frozenset(keywords)
+
+    def remove_structure_hits(self, hits):
+        """Remove the hits which aren't within a single value (e.g. in keys,
+        or across values)
+
+        Args:
+          hits: dictionary of pattern to its matches in the document
+        """
+
+        for pattern, spans in hits.items():
+            hits[pattern] = [
+                span for span in spans
+                if self.leaf_of(span[0], span[1]) is not None
+            ]
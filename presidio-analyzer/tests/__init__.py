@@ -1,7 +1,64 @@
+import contextlib
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(
     os.path.abspath(__file__)))+"/analyzer")
 
-from analyzer import matcher
+from analyzer import matcher, common_pb2
 match = matcher.Matcher()
+
+
+def field_types(*names, min_score=''):
+    """Create the field type filters of a request"""
+
+    filters = []
+    for name in names:
+        fieldType = common_pb2.FieldTypes()
+        fieldType.name = name
+        fieldType.minScore = min_score
+        filters.append(fieldType)
+    return filters
+
+
+class CountingNlp(object):
+    """Count the runs of the whole pipeline and of the tokenizer only of
+    an nlp"""
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+        self.tokenizer = nlp.tokenizer
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append('nlp')
+        return self.nlp(text)
+
+    def make_doc(self, text):
+        self.calls.append('make_doc')
+        return self.nlp.make_doc(text)
+
+
+@contextlib.contextmanager
+def counting_extract_context():
+    """Record the context extractions of match, as ('prefix', start,
+    prefix count) and ('suffix', end, suffix count) tuples"""
+
+    extract_prefix = match._Matcher__extract_prefix
+    extract_suffix = match._Matcher__extract_suffix
+    extractions = []
+
+    def counting_extract_prefix(tokens, start, count):
+        extractions.append(('prefix', start, count))
+        return extract_prefix(tokens, start, count)
+
+    def counting_extract_suffix(tokens, end, count):
+        extractions.append(('suffix', end, count))
+        return extract_suffix(tokens, end, count)
+
+    match._Matcher__extract_prefix = counting_extract_prefix
+    match._Matcher__extract_suffix = counting_extract_suffix
+    try:
+        yield extractions
+    finally:
+        del match._Matcher__extract_prefix
+        del match._Matcher__extract_suffix
@@ -5,6 +5,8 @@ import os
 import logging
 import cProfile, pstats, io
 from pstats import SortKey
+import pattern_registry
+import re2
 
 context = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. Aenean commodo dictum est, fringilla congue ex malesuada quis. Phasellus at posuere erat. Quisque blandit tristique lacus ut aliquam. Donec at maximus nisi. Quisque dapibus eros enim, quis tincidunt leo vehicula at. Maecenas suscipit nec ante pretium ornare. Nulla at dui vel mi blandit scelerisque. Phasellus vehicula vel nunc et convallis. Pellentesque nibh elit, molestie a lectus vitae, luctus fringilla quam. '
 
@@ -159,4 +161,78 @@ def test_profile_synthetic_json():
     ps.print_stats()
     val = s.getvalue()
     logging.info(val)
-    assert len(results) > 30
\ No newline at end of file
+    assert len(results) > 30
+
+
+# Pattern flags
+def union_max_mem(regex, flags):
+    """Smallest max_mem (to 1KB) RE2 compiles a regex with, a proxy for
+    the size of its program, which pyre2 doesn't expose: RE2 fails to
+    compile a program whose instructions don't fit in max_mem (and pyre2
+    falls back to the re module)"""
+
+    def compiles(max_mem):
+        try:
+            compiled = re2.compile(regex, flags, max_mem=max_mem)
+        except re2.error:
+            return False
+        return not isinstance(compiled, re2.SREPattern)
+
+    low, high = 0, 64 << 20
+    if not compiles(high):
+        return None
+    while high - low > 1024:
+        middle = (low + high) // 2
+        if compiles(middle):
+            high = middle
+        else:
+            low = middle
+    return high
+
+
+def scan_union(regex, flags, text):
+    union = re2.compile(regex, flags)
+    data = text.encode('utf-8')
+
+    start_time = datetime.datetime.now()
+    stops = 0
+    pos = 0
+    while True:
+        union_match = union.search(data, pos)
+        if union_match is None:
+            break
+        stops += 1
+        pos = union_match.start() + 1
+    return datetime.datetime.now() - start_time, stops
+
+
+def test_benchmark_pattern_flags():
+    patterns = [
+        pattern for pattern in match.rules.registry.compiled_patterns
+        if pattern.regex is not None
+    ]
+    global_flags = re2.IGNORECASE | re2.DOTALL | re2.MULTILINE
+
+    text = ''
+    for file_name in ('demo.txt', 'enron.txt', 'synthetic.json'):
+        path = os.path.dirname(__file__) + '/data/' + file_name
+        with open(path, 'r') as text_file:
+            text += text_file.read()
+
+    regex_before = '|'.join('(?:{})'.format(pattern.regex)
+                            for pattern in patterns)
+    regex_after = '|'.join(pattern_registry.inline_regex(pattern)
+                           for pattern in patterns)
+    time_before, stops_before = scan_union(regex_before, global_flags, text)
+    time_after, stops_after = scan_union(regex_after, 0, text)
+
+    logging.info('union max_mem: %s -> %s bytes',
+                 union_max_mem(regex_before, global_flags),
+                 union_max_mem(regex_after, 0))
+    logging.info('union stops: %d -> %d', stops_before, stops_after)
+    logging.info('union scan_time: %d.%06d -> %d.%06d seconds',
+                 time_before.seconds, time_before.microseconds,
+                 time_after.seconds, time_after.microseconds)
+
+    # Case sensitive patterns stop the union at fewer candidates
+    assert stops_after <= stops_before
@@ -0,0 +1,60 @@
+from analyzer import matcher, common_pb2
+from tests import *
+import pytest
+import types
+
+TEXTS = [
+    'my ssn is 078-05-1120',
+    'Dan Tailor came on May 1st',
+    'nothing here',
+    'my card 4012888888881881, mail info@presidio.site'
+]
+
+
+def summary(results):
+    return [(result.field.name, result.text, result.score,
+             result.location.start) for result in results]
+
+
+def test_results_in_the_order_of_the_texts():
+    for filters in [[], field_types('US_SSN', 'CREDIT_CARD')]:
+        results = match.analyze_texts(iter(TEXTS), filters, batch_size=2)
+
+        assert isinstance(results, types.GeneratorType)
+        assert [summary(result) for result in results] == \
+            [summary(match.analyze_text(text, filters)) for text in TEXTS]
+
+
+def test_texts_parsed_in_batches():
+    nlp_pipe = match.nlp.pipe
+    batches = []
+
+    def pipe(texts, batch_size):
+        batches.append(batch_size)
+        return nlp_pipe(texts, batch_size=batch_size)
+
+    match.nlp.pipe = pipe
+    try:
+        results = list(match.analyze_texts(
+            TEXTS, field_types('PERSON', 'US_SSN'), batch_size=3))
+        assert batches == [3]
+
+        list(match.analyze_texts(TEXTS, field_types('US_SSN')))
+        assert batches == [3]
+    finally:
+        del match.nlp.pipe
+
+    assert summary(results[0])[0][:2] == ('US_SSN', '078-05-1120')
+    assert summary(results[1])[0][:2] == ('PERSON', 'Dan Tailor')
+    assert results[2] == []
+
+
+def test_n_process_needs_spacy_2_2(monkeypatch):
+    monkeypatch.setattr(matcher, 'PIPE_SUPPORTS_N_PROCESS', False)
+
+    # Rejected when called, before any text is read
+    with pytest.raises(ValueError):
+        match.analyze_texts(TEXTS, field_types('PERSON'), n_process=2)
+
+    results = match.analyze_texts(TEXTS, field_types('US_SSN'), n_process=1)
+    assert len(list(results)) == len(TEXTS)
@@ -0,0 +1,52 @@
+from analyzer import matcher, common_pb2
+from tests import *
+from concurrent import futures
+from field_types import field_factory
+import copy
+
+TEXTS = [
+    'my credit card number is 4012-8888-8888-1881',
+    'my social security number is 078-05-1120',
+    'my driver license is H12234567, call 052 5552606',
+    'my phone number is (425) 882-9090 and my ip is 192.168.0.1',
+    'my domain is microsoft.com, email info@presidio.site',
+    'account 945456787654 and passport 912803456',
+    'no context here 078-05-1120 and cards 4012888888881881'
+]
+
+
+def analyze(text):
+    return [(result.field.name, result.text, result.score,
+             result.location.start, result.location.end)
+            for result in match.analyze_text(text, None)]
+
+
+def class_contexts():
+    contexts = {}
+    for name in field_factory.types_refs:
+        field = field_factory.FieldFactory.create(name)
+        contexts[name] = copy.copy(getattr(type(field), 'context', None))
+    return contexts
+
+
+def test_context_is_frozen():
+    field = match.rules.create('CREDIT_CARD')
+
+    assert isinstance(field.context, frozenset)
+    assert isinstance(type(field).context, list)
+    assert field.context == frozenset(type(field).context)
+
+
+def test_concurrent_requests():
+    contexts_before = class_contexts()
+    expected = [analyze(text) for text in TEXTS]
+
+    requests = TEXTS * 20
+    with futures.ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(analyze, requests))
+
+    for i, result in enumerate(results):
+        assert result == expected[i % len(TEXTS)]
+
+    # The field types' context isn't modified by the requests
+    assert class_contexts() == contexts_before
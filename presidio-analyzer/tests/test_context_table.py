@@ -0,0 +1,156 @@
+from analyzer import matcher, common_pb2
+from tests import *
+import context_table
+import json
+import pattern_pack
+
+PACK = {
+    "fields": [{
+        "name": "EMPLOYEE_ID",
+        "context": ["employee"],
+        "patterns": [{
+            "regex": r"\bemp-[0-9]{6}\b",
+            "strength": 0.4
+        }]
+    }]
+}
+
+
+def analyze(text, field_name):
+    field_type = common_pb2.FieldTypes()
+    field_type.name = field_name
+    return match.analyze_text(text, [field_type])
+
+
+def test_inflections():
+    assert context_table.inflections('phone') == {
+        'phone', 'phones', 'phoned', 'phoning'
+    }
+    assert 'licensed' in context_table.inflections('license')
+    assert 'securities' in context_table.inflections('security')
+    assert 'permitted' in context_table.inflections('permit')
+    assert 'taxes' in context_table.inflections('tax')
+    assert context_table.inflections('lic#') == {'lic#'}
+
+
+def test_forms_of_field_types():
+    table = match.rules.context_table
+
+    assert 'phones' in table.forms('PHONE_NUMBER')
+    assert 'licenses' in table.forms('US_DRIVER_LICENSE')
+    assert table.fields_of('ip') == {'IP_ADDRESS', 'DOMAIN_NAME'}
+    assert table.fields_of('unknown') == frozenset()
+
+
+def test_context_keywords_looked_up_once_per_span(monkeypatch):
+    table = match.rules.context_table
+    fields_of = table.fields_of
+    lookups = []
+
+    def counting_fields_of(word):
+        lookups.append(word)
+        return fields_of(word)
+
+    monkeypatch.setattr(table, 'fields_of', counting_fields_of)
+    results = analyze('my ssn 078-05-1120, my ssn 078-05-1121', 'US_SSN')
+
+    assert len(results) == 2
+    assert all(result.score > 0.79 for result in results)
+    assert lookups.count('ssn') == 2
+
+
+def test_card_and_number_only_in_phrases():
+    table = match.rules.context_table
+
+    assert table.fields_of('card') == frozenset()
+    assert table.fields_of('cards') == frozenset()
+    assert table.fields_of('number') == frozenset()
+    assert table.fields_of('card number') == {'CREDIT_CARD'}
+    assert table.fields_of('identification card') == {'US_DRIVER_LICENSE'}
+    assert table.fields_of('passport number') == {'US_PASSPORT'}
+
+    results = analyze('my card 1234567901234', 'US_DRIVER_LICENSE')
+    assert len(results) == 1
+    assert results[0].score < 0.1
+    results = analyze('my identification card 1234567901234',
+                      'US_DRIVER_LICENSE')
+    assert len(results) == 1
+    assert results[0].score > 0.55
+
+    results = analyze('my number 912803456', 'US_PASSPORT')
+    assert len(results) == 1
+    assert results[0].score < 0.1
+
+
+def test_stop_words():
+    table = match.rules.context_table
+
+    assert table.fields_of('us') == frozenset()
+    assert table.fields_of('call') == frozenset()
+
+
+def test_inflected_context_word():
+    results = analyze('my ssns 078-05-1120', 'US_SSN')
+    assert len(results) == 1
+    assert results[0].score > 0.79
+
+    results = analyze('phoned from 052 5552606', 'PHONE_NUMBER')
+    assert len(results) == 1
+    assert results[0].score > 0.75
+
+
+def test_table_of_reloaded_pack(tmpdir):
+    path = str(tmpdir.join('pack.json'))
+    with open(path, 'w') as pack_file:
+        json.dump(PACK, pack_file)
+
+    try:
+        match.load_pattern_pack(pattern_pack.PatternPack(path))
+        assert match.rules.context_table.fields_of('employees') == {
+            'EMPLOYEE_ID'
+        }
+    finally:
+        match.load_pattern_pack(None)
+
+    assert match.rules.context_table.fields_of('employees') == frozenset()
+
+
+def test_phrases():
+    table = match.rules.context_table
+
+    assert table.fields_of('social security') == {'US_SSN'}
+    assert table.fields_of('checking account') == {'US_BANK_NUMBER'}
+    assert 'security' in table.phrase_trie['social']
+    assert table.phrase_trie['national']['health']['service'][None] == \
+        'national health service'
+
+
+def test_phrase_context(tmpdir):
+    # Neither 'staff' nor 'number' is context on its own
+    pack = {
+        "fields": [{
+            "name": "STAFF_ID",
+            "context": ["staff number"],
+            "patterns": [{
+                "regex": r"\bst-[0-9]{6}\b",
+                "strength": 0.4
+            }]
+        }]
+    }
+    path = str(tmpdir.join('pack.json'))
+    with open(path, 'w') as pack_file:
+        json.dump(pack, pack_file)
+
+    try:
+        match.load_pattern_pack(pattern_pack.PatternPack(path))
+        results = analyze('my staff number st-123456', 'STAFF_ID')
+        assert len(results) == 1
+        assert results[0].score > 0.7
+
+        for text in ['my staff st-123456', 'my number st-123456',
+                     'number of staff st-123456']:
+            results = analyze(text, 'STAFF_ID')
+            assert len(results) == 1
+            assert results[0].score < 0.41
+    finally:
+        match.load_pattern_pack(None)
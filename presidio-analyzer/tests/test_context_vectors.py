@@ -0,0 +1,114 @@
+from analyzer import matcher, common_pb2
+from tests import *
+import context_table
+import context_vectors
+import field_rules
+import numpy as np
+from spacy.vocab import Vocab
+from field_types import field_type
+
+VECTORS = {
+    'license': [1.0, 0.0, 0.0],
+    'licence': [0.9, 0.1, 0.0],
+    'driver': [0.8, 0.0, 0.6],
+    'ssn': [0.0, 1.0, 0.0],
+    'banana': [0.0, 0.0, 1.0],
+    'the': [1.0, 0.0, 0.0]
+}
+
+
+class ContextField(field_type.FieldType):
+    def __init__(self, name, context):
+        self.name = name
+        self.context = context
+
+
+def create_vocab():
+    vocab = Vocab()
+    for word, vector in VECTORS.items():
+        vocab.set_vector(word, np.array(vector, dtype=np.float32))
+    return vocab
+
+
+def test_similarities_of_all_candidates():
+    table = context_table.ContextTable([
+        ContextField('LICENSE', ['license', 'unknown']),
+        ContextField('SSN', ['ssn']),
+        ContextField('NO_VECTORS', ['unknown'])
+    ])
+    vectors = context_vectors.ContextVectors(table, create_vocab())
+
+    assert sorted(vectors.columns) == ['LICENSE', 'SSN']
+
+    similarities = vectors.similarities([
+        ['my', 'licence'], ['banana', 'ssn'], [], ['the'], ['unknown']
+    ])
+    licence, ssn = vectors.columns['LICENSE'], vectors.columns['SSN']
+
+    assert similarities.shape == (5, 2)
+    assert similarities[0][licence] > 0.99
+    assert similarities[0][ssn] < 0.2
+    assert similarities[1][licence] == 0
+    assert similarities[1][ssn] > 0.99
+    # Stop words and words without vectors are not similar to anything
+    assert not similarities[2:].any()
+
+
+def test_phrase_vectors():
+    table = context_table.ContextTable([
+        ContextField('LICENSE', ['driver license'])
+    ])
+    vectors = context_vectors.ContextVectors(table, create_vocab())
+
+    similarities = vectors.similarities([['licence'], ['banana']])
+    assert 0.9 < similarities[0][0] < 0.99
+    assert 0.2 < similarities[1][0] < 0.4
+
+
+def test_semantic_context_mode():
+    field = common_pb2.FieldTypes()
+    field.name = 'US_DRIVER_LICENSE'
+    text = 'my licence 1234567901234'
+
+    results = match.analyze_text(text, [field])
+    assert len(results) == 1
+    assert results[0].score < 0.1
+
+    rules = match.rules
+    match.rules = field_rules.FieldRules(vocab=create_vocab())
+    try:
+        results = match.analyze_text(text, [field])
+        assert len(results) == 1
+        assert results[0].score > 0.55
+
+        results = match.analyze_text('banana 1234567901234', [field])
+        assert len(results) == 1
+        assert results[0].score < 0.1
+    finally:
+        match.rules = rules
+
+
+def test_only_scored_matches_are_compared():
+    field = common_pb2.FieldTypes()
+    field.name = 'US_DRIVER_LICENSE'
+
+    rules = match.rules
+    match.rules = field_rules.FieldRules(vocab=create_vocab())
+    similarities = match.rules.context_vectors.similarities
+    contexts = []
+
+    def recording_similarities(candidates):
+        contexts.extend(candidates)
+        return similarities(candidates)
+
+    match.rules.context_vectors.similarities = recording_similarities
+    try:
+        # The digits pattern is weaker than the alphanumeric one, which
+        # has a result
+        results = match.analyze_text('my licence H12234567 1234567901234',
+                                     [field])
+    finally:
+        match.rules = rules
+
+    assert [result.text for result in results] == ['H12234567']
+    assert len(contexts) == 1
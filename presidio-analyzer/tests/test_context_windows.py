@@ -0,0 +1,52 @@
+from analyzer import matcher, common_pb2
+from tests import *
+
+
+def count_extracted_context(text, filters, context_windows=None):
+    with counting_extract_context() as extractions:
+        results = match.analyze_text(text, filters,
+                                     context_windows=context_windows)
+
+    return results, [(side, count) for side, _, count in extractions]
+
+
+def test_context_after_the_match():
+    results = match.analyze_text('078-05-1120 (my ssn)',
+                                 field_types('US_SSN'))
+
+    assert len(results) == 1
+    assert results[0].score > 0.7
+
+
+def test_request_context_windows():
+    text = 'my driver license 1234567901234'
+    results = match.analyze_text(text, field_types('US_DRIVER_LICENSE'))
+    assert results[0].score > 0.55
+
+    results, windows = count_extracted_context(
+        text, field_types('US_DRIVER_LICENSE'),
+        {'US_DRIVER_LICENSE': (1, 0)})
+    assert windows == [('prefix', 1)]
+    assert results[0].score > 0.55
+
+    results, windows = count_extracted_context(
+        'my ssn 078-05-1120', field_types('US_SSN'), {'US_SSN': (0, 0)})
+    assert windows == []
+    assert results[0].score < 0.55
+
+
+def test_no_context_for_checksum_fields():
+    results, windows = count_extracted_context(
+        'my card 4012888888881881', field_types('CREDIT_CARD'))
+
+    assert len(results) == 1
+    assert windows == []
+
+
+def test_parse_context_windows():
+    assert match.parse_context_windows(None) == {}
+    assert match.parse_context_windows('US_SSN=5:2, US_PASSPORT=0:1') == {
+        'US_SSN': (5, 2),
+        'US_PASSPORT': (0, 1)
+    }
+    assert match.parse_context_windows('US_SSN=5,US_PASSPORT=-1:0,X') == {}
@@ -1,5 +1,6 @@
 from analyzer import matcher, common_pb2
 from tests import *
+from field_types.globally import credit_card
 import os
 
 # https://www.datatrans.ch/showcase/test-cc-numbers
@@ -182,3 +183,46 @@ def test_invalid_diners_card():
     results = match.analyze_text('my credit card number is ' + number, types)
 
     assert len(results) == 0
+
+
+def test_invalid_credit_card_out_of_issuer_ranges():
+    # Valid checksum, but no issuer starts with 60 (besides 6011)
+    number = '6000000000000007'
+    results = match.analyze_text(number, types)
+
+    assert len(results) == 0
+
+
+def test_invalid_credit_card_length_of_issuer():
+    # Valid checksum, but Amex numbers have 15 digits
+    number = '3400000000000000'
+    results = match.analyze_text(number, types)
+
+    assert len(results) == 0
+
+
+def test_find_issuer():
+    assert credit_card.find_issuer('4012888888881881') == 'Visa'
+    assert credit_card.find_issuer('371449635398431') == 'American Express'
+    assert credit_card.find_issuer('5019717010103742') == 'Dankort'
+    assert credit_card.find_issuer('501912345678901234') == 'Maestro'
+    assert credit_card.find_issuer('5555555555554444') == 'Mastercard'
+    assert credit_card.find_issuer('3528000700000000') == 'JCB'
+    assert credit_card.find_issuer('30569309025904') == 'Diners Club'
+    assert credit_card.find_issuer('122000000000003') == 'UATP'
+    assert credit_card.find_issuer('6000000000000007') is None
+
+
+def test_issuer_of_checked_credit_card():
+    field = credit_card.CreditCard()
+    field.text = '6011-0004-0000-0000'
+    assert field.check_checksum()
+    assert field.get_details() == 'Discover'
+
+
+def test_credit_card_issuers_details():
+    details = {}
+    match.analyze_text('cards 4012888888881881 and 5555-5555-5555-4444',
+                       types, details=details)
+
+    assert details == {'card-issuers': {6: 'Visa', 27: 'Mastercard'}}
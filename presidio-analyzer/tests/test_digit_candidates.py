@@ -0,0 +1,68 @@
+from analyzer import matcher
+from tests import *
+from field_types import field_digit_pattern
+import digit_candidates
+import pytest
+
+
+def find(segments, text):
+    runs = digit_candidates.DigitRuns(text.encode('utf-8'))
+    return [(start, end) for start, end in digit_candidates.find_matches(
+        runs, digit_candidates.compile_segments(segments))]
+
+
+def test_runs_are_joined_by_single_separators():
+    runs = digit_candidates.DigitRuns(b'123-45 6789--0 a1')
+
+    assert runs.starts == [0, 4, 7, 13, 16]
+    assert runs.separators == [None, ord('-'), ord(' '), None, None]
+    assert runs.left_bounded == [True, True, True, True, False]
+
+
+def test_separated_segments():
+    dash = field_digit_pattern.Separator('-')
+
+    assert find([[3, dash, 2, dash, 4]], 'ssn 078-05-1120 or 078-051120') \
+        == [(4, 15)]
+
+
+def test_optional_separators_split_runs():
+    separator = field_digit_pattern.Separator('- ', optional=True)
+    segments = [[3, separator, 3, separator, 4]]
+
+    assert find(segments, '401 023 2137 4010232137 401-0232137') == [
+        (0, 12), (13, 23), (24, 35)]
+
+
+def test_segments_need_word_boundaries():
+    assert find([[9]], 'a078051120 078051120b 078051120') == [(22, 31)]
+
+
+def test_prefixes():
+    segments = [[(4, 4, ['4', '51']), (4, 4)]]
+
+    assert find(segments, '40128888 51001234 52001234') == [(0, 8), (9, 17)]
+
+
+def test_alternatives_in_order():
+    assert find([[(1, 14)], [16]], '1 12345678901234 123456789012345 '
+                '1234567890123456') == [(0, 1), (2, 16), (33, 49)]
+
+
+def test_separator_must_follow_a_segment():
+    with pytest.raises(ValueError):
+        digit_candidates.compile_segments(
+            [[field_digit_pattern.Separator('-'), 4]])
+
+
+def test_should_stop_keeps_earlier_matches():
+    runs = digit_candidates.DigitRuns(b'078051120 078051121 078051122')
+    checks = []
+
+    def should_stop():
+        checks.append(True)
+        return len(checks) > 2
+
+    assert digit_candidates.find_matches(
+        runs, digit_candidates.compile_segments([[9]]),
+        should_stop) == [(0, 9), (10, 19)]
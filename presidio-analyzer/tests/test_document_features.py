@@ -0,0 +1,64 @@
+from analyzer import matcher, common_pb2
+from tests import *
+from field_types import field_factory, document_features
+
+
+def can_match(text, field_type):
+    features = document_features.DocumentFeatures(text)
+    field = field_factory.FieldFactory.create(
+        common_pb2.FieldTypesEnum.Name(field_type))
+    return features.can_match(field)
+
+
+def test_prose_skips_numeric_fields():
+    text = 'This is just a sentence, with no numbers at all'
+
+    for field_type in (common_pb2.US_SSN, common_pb2.US_PASSPORT,
+                       common_pb2.US_BANK_NUMBER, common_pb2.UK_NHS,
+                       common_pb2.CREDIT_CARD, common_pb2.US_ITIN,
+                       common_pb2.PHONE_NUMBER, common_pb2.IBAN_CODE):
+        assert can_match(text, field_type) is False
+
+
+def test_short_digit_runs_skip_long_numeric_fields():
+    text = 'call me at 10 or 11'
+
+    assert can_match(text, common_pb2.US_BANK_NUMBER) is False
+    assert can_match(text, common_pb2.US_PASSPORT) is False
+    assert can_match(text, common_pb2.CRYPTO) is True
+
+
+def test_email_requires_at_and_dot():
+    field_type = common_pb2.EMAIL_ADDRESS
+
+    assert can_match('info at presidio.site', field_type) is False
+    assert can_match('info@presidio', field_type) is False
+    assert can_match('info@presidio.site', field_type) is True
+
+
+def test_ip_requires_dot_or_colon():
+    assert can_match('no address here', common_pb2.IP_ADDRESS) is False
+    assert can_match('192.168.0.1', common_pb2.IP_ADDRESS) is True
+    assert can_match('fe80::abcd', common_pb2.IP_ADDRESS) is True
+
+
+def test_ner_and_driver_license_are_never_skipped():
+    assert can_match('', common_pb2.PERSON) is True
+    assert can_match('', common_pb2.US_DRIVER_LICENSE) is True
+
+
+def test_skipped_fields_do_not_change_results():
+    text = 'my email is info@presidio.site and my ssn is 078-05-1120'
+    results = match.analyze_text(text, [])
+
+    assert any(r.field.name == 'EMAIL_ADDRESS' for r in results)
+    assert any(r.field.name == 'US_SSN' for r in results)
+
+
+def test_skipped_fields_use_the_startup_scanner():
+    scanner = match.rules.scanner
+    for text in ('This is just a sentence', 'call me at 10 or 11',
+                 'info@presidio.site', 'fe80::abcd 078-05-1120'):
+        match.analyze_text(text, [])
+
+    assert match.rules.scanner is scanner
@@ -0,0 +1,98 @@
+from analyzer import matcher, common_pb2
+from tests import *
+import document_tokens
+
+
+def analyze_counting_nlp(text, names):
+    nlp = match.nlp
+    match.nlp = CountingNlp(nlp)
+    try:
+        results = match.analyze_text(text, field_types(*names))
+        return results, match.nlp.calls
+    finally:
+        match.nlp = nlp
+
+
+def test_context_keywords_from_parsed_document():
+    results, calls = analyze_counting_nlp(
+        'my social security number is 078-05-1120, or 078-05-1121',
+        ['US_SSN'])
+
+    assert len(results) == 2
+    assert all(result.score > 0.6 for result in results)
+    assert calls == ['make_doc']
+
+
+def test_no_nlp_for_checksum_field_types():
+    results, calls = analyze_counting_nlp(
+        'my card 4012888888881881, mail info@presidio.site',
+        ['CREDIT_CARD', 'EMAIL_ADDRESS'])
+
+    assert len(results) == 2
+    assert calls == []
+
+
+def test_whole_pipeline_for_ner_field_types():
+    results, calls = analyze_counting_nlp(
+        'Dan Tailor, ssn 078-05-1120', ['PERSON', 'US_SSN'])
+
+    assert len(results) == 2
+    assert calls == ['nlp']
+
+
+def test_context_keywords_running_into_match():
+    fieldType = common_pb2.FieldTypes()
+    fieldType.name = common_pb2.FieldTypesEnum.Name(
+        common_pb2.US_DRIVER_LICENSE)
+    results = match.analyze_text('my driver license:H12234567', [fieldType])
+
+    assert len(results) == 1
+    assert results[0].text == 'H12234567'
+    assert results[0].score > 0.59
+
+
+def test_words_before_offset():
+    text = 'my phone  number is:(425) 882-9090'
+    tokens = document_tokens.DocumentTokens(match.nlp(text))
+    start = text.index('(')
+
+    assert tokens.words_of(*tokens.before(start, 2))[0].text == 'number'
+    assert tokens.words_of(*tokens.before(start, 5))[0].text == 'my'
+    assert tokens.words_of(*tokens.before(start, 0)) == []
+    assert tokens.before(0, 5) == (0, 0)
+
+
+def test_words_after_offset():
+    text = '425-882-9090 is  my phone'
+    tokens = document_tokens.DocumentTokens(match.nlp(text))
+    end = text.index(' ')
+
+    assert [token.text for token in tokens.words_of(
+        *tokens.after(end, 2))] == ['is', 'my']
+    assert [token.text for token in tokens.words_of(
+        *tokens.after(end, 9))] == ['is', 'my', 'phone']
+    assert tokens.words_of(*tokens.after(len(text), 2)) == []
+
+
+def test_phrases_between_tokens():
+    trie = {'social': {'security': {None: 'social security'}},
+            'security': {None: 'security'}}
+    text = 'social security social, security'
+    tokens = document_tokens.DocumentTokens(match.nlp(text), trie)
+
+    assert tokens.phrases_of(0, 2) == ['social security', 'security']
+    assert tokens.phrases_of(1, 4) == ['security']
+    assert tokens.phrases_of(0, 1) == []
+
+
+def test_context_extracted_once_per_span():
+    with counting_extract_context() as extractions:
+        results = match.analyze_text(
+            'my passport 912803456',
+            field_types('US_SSN', 'US_PASSPORT', 'US_BANK_NUMBER',
+                        'US_DRIVER_LICENSE'))
+
+    # The prefix is shared with US_SSN, which has a suffix too
+    assert len(results) > 1
+    assert all(result.text == '912803456' for result in results)
+    assert extractions == [('prefix', 12, 5), ('suffix', 21, 2)]
@@ -36,13 +36,11 @@ def test_invalid_ipv4():
     assert len(results) == 0
 
 
-'''
-TODO: fix ipv6 regex
 def test_valid_ipv6():
     ip = '684D:1111:222:3333:4444:5555:6:77'
     context = 'microsoft.com '
     results = match.analyze_text(context + ip, types)
-    
+
     assert len(results) == 1
     assert results[0].text == ip
     assert results[0].score > 0.59 and results[0].score < 0.8
@@ -52,11 +50,18 @@ def test_valid_ipv6_with_exact_context():
     ip = '684D:1111:222:3333:4444:5555:6:77'
     context = 'my ip: '
     results = match.analyze_text(context + ip, types)
-    
+
     assert len(results) == 1
     assert results[0].text == ip
     assert results[0].score > 0.79 and results[0].score < 1
-'''
+
+
+def test_valid_ipv6_compressed():
+    ip = 'fe80::1ff:fe23:4567:890a'
+    results = match.analyze_text('the ip is ' + ip, types)
+
+    assert len(results) == 1
+    assert results[0].text == ip
 
 
 def test_invalid_ipv6():
@@ -64,3 +69,55 @@ def test_invalid_ipv6():
     results = match.analyze_text('the ip is ' + ip, types)
 
     assert len(results) == 0
+
+
+def test_valid_ipv6_compressed_single_hextet():
+    results = match.analyze_text('the ips are ::1, fe80:: and dead::be7f',
+                                 types)
+
+    assert [result.text for result in results] == ['::1', 'fe80::',
+                                                   'dead::be7f']
+
+
+def test_invalid_ipv6_compressed_word():
+    results = match.analyze_text('add:: face:: Cafe::Bar std::', types)
+
+    assert len(results) == 0
+
+
+def test_invalid_ipv6_compressed_letters():
+    results = match.analyze_text('call DB::Add or a::b, not dead::beef',
+                                 types)
+
+    assert len(results) == 0
+
+
+def test_invalid_ipv6_too_many_hextets():
+    ip = '1:2:3:4:5:6:7:8:9'
+    results = match.analyze_text('the ip is ' + ip, types)
+
+    assert len(results) == 0
+
+
+def test_valid_ipv6_ending_with_ipv4():
+    ip = '::ffff:192.168.0.1'
+    results = match.analyze_text('the ip is ' + ip + ' ', types)
+
+    assert len(results) == 1
+    assert results[0].text == ip
+
+
+def test_valid_ipv4_and_ipv6_in_the_same_text():
+    text = 'from 10.0.0.1:8080 to [2001:db8::1]:443'
+    results = match.analyze_text(text, types)
+
+    assert len(results) == 2
+    assert results[0].text == '10.0.0.1'
+    assert results[1].text == '2001:db8::1'
+
+
+def test_invalid_ipv4_octet_out_of_range():
+    ip = '192.168.0.256'
+    results = match.analyze_text('the ip is ' + ip, types)
+
+    assert len(results) == 0
@@ -0,0 +1,49 @@
+from analyzer import matcher, common_pb2
+from tests import *
+
+
+def test_results_below_min_score():
+    num = '1234567901234'
+    results = match.analyze_text(num, field_types('US_DRIVER_LICENSE'))
+    assert len(results) == 1
+    assert results[0].score < 0.1
+
+    results = match.analyze_text(
+        num, field_types('US_DRIVER_LICENSE', min_score='0.5'))
+    assert len(results) == 0
+
+
+def test_results_with_context_above_min_score():
+    num = '1234567901234'
+    context = 'my driver license is: '
+    results = match.analyze_text(
+        context + num, field_types('US_DRIVER_LICENSE', min_score='0.5'))
+
+    assert len(results) == 1
+    assert results[0].text == num
+    assert results[0].score > 0.55
+
+
+def test_patterns_which_cant_get_min_score_are_skipped():
+    with counting_extract_context() as extractions:
+        # The best SSN score, with context, is 0.85
+        results = match.analyze_text('my ssn is 078-05-1120',
+                                     field_types('US_SSN', min_score='0.9'))
+
+    assert len(results) == 0
+    assert extractions == []
+
+
+def test_checksum_results_above_min_score():
+    results = match.analyze_text('4012888888881881',
+                                 field_types('CREDIT_CARD', min_score='0.99'))
+
+    assert len(results) == 1
+    assert results[0].score == 1.0
+
+
+def test_invalid_min_score_is_ignored():
+    results = match.analyze_text('my ssn is 078-05-1120',
+                                 field_types('US_SSN', min_score='high'))
+
+    assert len(results) == 1
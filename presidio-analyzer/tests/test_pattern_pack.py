@@ -0,0 +1,154 @@
+from analyzer import matcher, common_pb2
+from tests import *
+import json
+import os
+import pattern_pack
+import pytest
+
+PACK = {
+    "version": "2",
+    "fields": [{
+        "name": "US_SSN",
+        "context": ["ssn"],
+        "patterns": [{
+            "name": "SSN (dots)",
+            "regex": r"\b([0-9]{3})\.([0-9]{2})\.([0-9]{4})\b",
+            "strength": 0.5
+        }]
+    }, {
+        "name": "EMPLOYEE_ID",
+        "context": ["employee"],
+        "patterns": [{
+            "name": "Employee ID (medium)",
+            "regex": r"\bemp-[0-9]{6}\b",
+            "strength": 0.4,
+            "flags": ["IGNORECASE"]
+        }]
+    }]
+}
+
+
+def write_pack(tmpdir, pack, name='pack.json'):
+    path = str(tmpdir.join(name))
+    with open(path, 'w') as pack_file:
+        json.dump(pack, pack_file)
+    return path
+
+
+def analyze(text, field_name):
+    field_type = common_pb2.FieldTypes()
+    field_type.name = field_name
+    return match.analyze_text(text, [field_type])
+
+
+def test_pack_overrides_and_adds_field_types(tmpdir):
+    pack = pattern_pack.PatternPack(write_pack(tmpdir, PACK))
+    try:
+        match.load_pattern_pack(pack)
+        assert match.rules.version == '2'
+
+        results = analyze('my ssn 078.05.1120 not 078-05-1120', 'US_SSN')
+        assert len(results) == 1
+        assert results[0].text == '078.05.1120'
+        assert results[0].score > 0.79
+
+        results = analyze('badge EMP-123456', 'EMPLOYEE_ID')
+        assert len(results) == 1
+        assert results[0].text == 'EMP-123456'
+    finally:
+        match.load_pattern_pack(None)
+
+    assert len(analyze('my ssn 078.05.1120', 'US_SSN')) == 0
+
+
+def test_pack_does_not_change_the_built_in_field_types(tmpdir):
+    pack = pattern_pack.PatternPack(write_pack(tmpdir, PACK))
+    field = pack.create('US_SSN')
+
+    assert field.patterns is not type(field).patterns
+    assert pack.create('CREDIT_CARD').patterns is \
+        type(pack.create('CREDIT_CARD')).patterns
+
+
+def test_invalid_packs_are_rejected(tmpdir):
+    invalid_packs = [
+        {"fields": [{"context": ["x"]}]},
+        {"fields": [{"name": "PERSON", "context": ["x"]}]},
+        {"fields": [{"name": "NEW_FIELD", "context": ["x"]}]},
+        {"fields": [{"name": "US_SSN", "patterns": [{"name": "x"}]}]},
+        {"fields": [{"name": "US_SSN", "patterns": [
+            {"regex": "x", "flags": ["VERBOSE"]}]}]},
+        {"fields": [{"name": "US_SSN", "patterns": [
+            {"regex": "x", "max_matches": "5"}]}]},
+        {"fields": [{"name": "US_SSN", "patterns": [
+            {"regex": "x", "max_mem": 0}]}]},
+        {"fields": [{"name": "US_SSN", "patterns": [
+            {"regex": "x", "time_budget": True}]}]},
+        {"fields": [{"name": "US_SSN", "patterns": [
+            {"regex": "x", "strength": None}]}]},
+        {"fields": [{"name": "US_SSN", "patterns": [
+            {"regex": "x", "strength": 2}]}]},
+        {"fields": [{"name": "US_SSN", "patterns": [
+            {"regex": "x", "flags": "IGNORECASE"}]}]},
+        {"fields": [{"name": "US_SSN", "min_digit_run": []}]},
+    ]
+    for pack in invalid_packs:
+        with pytest.raises(ValueError):
+            pattern_pack.PatternPack(write_pack(tmpdir, pack))
+
+    path = str(tmpdir.join('broken.json'))
+    with open(path, 'w') as pack_file:
+        pack_file.write('{"fields": [')
+    with pytest.raises(ValueError):
+        pattern_pack.PatternPack(path)
+
+
+def test_invalid_regex_keeps_the_current_rules(tmpdir):
+    pack = {"fields": [{"name": "US_SSN", "patterns": [{"regex": "([0-9"}]}]}
+    rules = match.rules
+
+    with pytest.raises(ValueError):
+        match.load_pattern_pack(
+            pattern_pack.PatternPack(write_pack(tmpdir, pack)))
+    assert match.rules is rules
+
+
+def test_watcher_reloads_a_modified_pack(tmpdir):
+    path = write_pack(tmpdir, PACK)
+    loaded = []
+    watcher = pattern_pack.PackWatcher(path, loaded.append)
+
+    assert not watcher.check()
+
+    with open(path, 'w') as pack_file:
+        pack_file.write('{"fields": [')
+    os.utime(path, (1, 1))
+    assert not watcher.check()
+
+    write_pack(tmpdir, dict(PACK, version="3"))
+    os.utime(path, (2, 2))
+    assert watcher.check()
+    assert loaded[0].version == '3'
+
+
+def test_watcher_survives_a_failing_reload(tmpdir):
+    path = write_pack(tmpdir, PACK)
+
+    def fail(pack):
+        raise TypeError('broken')
+
+    watcher = pattern_pack.PackWatcher(path, fail)
+    os.utime(path, (1, 1))
+    assert not watcher.check()
+
+
+def test_pack_context_windows(tmpdir):
+    pack = {"fields": [{"name": "US_SSN", "context_suffix_count": 1}]}
+    field = pattern_pack.PatternPack(write_pack(tmpdir, pack)).create('US_SSN')
+
+    assert field.context_prefix_count == 5
+    assert field.context_suffix_count == 1
+
+    pack = {"fields": [{"name": "US_SSN", "context_prefix_count": "5"}]}
+    with pytest.raises(ValueError):
+        pattern_pack.PatternPack(write_pack(tmpdir, pack))
@@ -0,0 +1,106 @@
+from analyzer import matcher
+from tests import *
+from field_types import field_type, field_regex_pattern
+import pattern_registry
+import datetime
+import pytest
+
+
+class BrokenField(field_type.FieldType):
+    name = "BROKEN"
+    patterns = []
+
+    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern.regex = r'\b([0-9]{3}\b'
+    pattern.name = 'Broken (unbalanced)'
+    pattern.strength = 0.5
+    patterns.append(pattern)
+
+
+def test_all_patterns_are_compiled():
+    for pattern, compiled_pattern in match.rules.registry.compiled_patterns.items():
+        assert compiled_pattern.pattern is pattern
+        assert compiled_pattern.compiled is not None or \
+            compiled_pattern.engine == pattern_registry.ENGINE_ANCHORS
+        assert compiled_pattern.engine in (pattern_registry.ENGINE_RE2,
+                                           pattern_registry.ENGINE_RE,
+                                           pattern_registry.ENGINE_DIGITS,
+                                           pattern_registry.ENGINE_ANCHORS)
+
+
+def test_report_has_a_line_per_pattern():
+    report = match.rules.registry.report()
+
+    assert len(report) == len(match.rules.registry.compiled_patterns)
+    assert all('engine:' in line for line in report)
+
+
+def test_broken_pattern_is_rejected():
+    with pytest.raises(ValueError):
+        pattern_registry.PatternRegistry([BrokenField()])
+
+
+class LookaheadField(field_type.FieldType):
+    name = "LOOKAHEAD"
+    patterns = []
+
+    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern.regex = r'\b(?=.*\d)[A-Z0-9]{8}\b'
+    pattern.name = 'Lookahead (weak)'
+    pattern.strength = 0.3
+    patterns.append(pattern)
+
+
+def test_shipped_patterns_do_not_fall_back():
+    assert len(match.rules.registry.fallback_patterns()) == 0
+    assert len(match.rules.registry.audit()) == 0
+
+
+def test_fallback_pattern_is_audited():
+    registry = pattern_registry.PatternRegistry([LookaheadField()])
+    compiled_pattern = registry.get(LookaheadField.pattern)
+
+    assert compiled_pattern.engine == pattern_registry.ENGINE_RE
+    assert len(registry.audit()) == 1
+
+    compiled_pattern.count_fallback()
+    assert compiled_pattern.fallback_count == 1
+
+
+def test_fallback_pattern_is_rejected_in_strict_mode():
+    with pytest.raises(ValueError):
+        pattern_registry.PatternRegistry([LookaheadField()], strict=True)
+
+
+class LimitedField(field_type.FieldType):
+    name = "LIMITED"
+    patterns = []
+
+    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern.regex = r'\b[0-9]{8}\b'
+    pattern.name = 'Limited (weak)'
+    pattern.strength = 0.3
+    pattern.max_matches = 5
+    patterns.append(pattern)
+
+
+def test_pattern_limits_override_the_budget():
+    budget = pattern_registry.PatternBudget(max_mem=1 << 20, max_matches=10,
+                                            time_budget=0.5)
+    registry = pattern_registry.PatternRegistry([LimitedField()],
+                                                budget=budget)
+    compiled_pattern = registry.get(LimitedField.pattern)
+
+    assert compiled_pattern.max_mem == 1 << 20
+    assert compiled_pattern.max_matches == 5
+    assert compiled_pattern.time_budget == 0.5
+
+
+def test_report_compile_time_in_seconds():
+    registry = pattern_registry.PatternRegistry([LookaheadField()])
+    compiled_pattern = registry.get(LookaheadField.patterns[0])
+    compiled_pattern.compile_time = datetime.timedelta(microseconds=549)
+
+    assert registry.report()[0].endswith(
+        "regex_length: {} compile_time: 0.000549 seconds".format(
+            len(LookaheadField.patterns[0].regex)))
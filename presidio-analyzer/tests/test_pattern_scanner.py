@@ -0,0 +1,218 @@
+from analyzer import matcher
+from tests import *
+from field_types import field_factory, field_type, field_regex_pattern
+import pattern_registry
+import pattern_scanner
+import re2 as re
+import os
+
+fields = list(
+    filter(lambda f: f is not None and f.patterns,
+           map(field_factory.FieldFactory.create,
+               sorted(field_factory.types_refs))))
+registry = pattern_registry.PatternRegistry(fields)
+
+
+def regex_field(name, regex):
+    field = field_type.FieldType()
+    field.name = name
+    pattern = field_regex_pattern.RegexFieldPattern()
+    pattern.regex = regex
+    pattern.name = name
+    pattern.strength = 0.5
+    field.patterns = [pattern]
+    return field
+
+
+def assert_same_as_finditer(text, fields=fields, registry=registry):
+    hits = pattern_scanner.PatternScanner(fields, registry).scan(text)
+
+    for field in fields:
+        for pattern in field.patterns:
+            if pattern.regex is None:
+                continue
+            expected = [
+                match.span() for match in re.finditer(
+                    pattern.regex, text, flags=pattern.flags)
+                if pattern.validator is None or pattern.validator(
+                    match.group())
+            ]
+            assert hits[pattern] == expected
+
+
+def test_scan_overlapping_patterns():
+    assert_same_as_finditer(
+        'my ssn is 078-05-1120, card 4012-8888-8888-1881 and '
+        'phone (425) 882-9090 or 425 8829090 at 192.168.0.1')
+
+
+def test_scan_non_ascii_text():
+    assert_same_as_finditer(
+        'Café ñandú: 078051120 — info@presidio.site, 911-70-1234 ü')
+
+
+def test_scan_digit_runs():
+    assert_same_as_finditer(
+        '911 70 1234 91170-1234 911-701234 9117012345 401-023-2137 '
+        '401.023 2137 4012888888881881 5500 0000 0000 0004 1-2-3 '
+        '12345678901234567 078-05-1120-3 a078051120 0780511201b')
+
+
+def test_scan_anchors():
+    assert_same_as_finditer(
+        'mail a.b@x.io, !x@y.co.uk .x@y.com x.@y.com a@b a@b-c.d_e x@@y.z '
+        'visit www.microsoft.com.au, sub.-bad.com foo_bar.com a-b.c-d.net '
+        'end of sentence. 192.168.0.1 ñ.com x.y.verylongsuffixoftwentysix')
+
+
+def test_scan_regexes_matching_at_the_same_position():
+    # Only some of the regexes match where the union stops, and a regex
+    # may start inside the match of another one
+    overlapping_fields = [
+        regex_field('A', r'\b[a-z]+[0-9]\b'),
+        regex_field('B', r'[0-9]{2}'),
+        regex_field('C', r'\b[0-9]+\b'),
+        regex_field('D', r'x?[0-9]'),
+        regex_field('E', r'[zZ]')
+    ]
+    overlapping_registry = pattern_registry.PatternRegistry(
+        overlapping_fields)
+
+    assert_same_as_finditer('abc1 12345 x7 z 9 ab12 Z3 123-45',
+                            overlapping_fields, overlapping_registry)
+
+
+def test_scan_some_field_types():
+    text = 'my ssn is 078-05-1120, card 4012-8888-8888-1881, a@b.com'
+    scanner = pattern_scanner.PatternScanner(fields, registry)
+    all_hits = scanner.scan(text)
+    hits = scanner.scan(text, ['US_SSN', 'EMAIL_ADDRESS'])
+
+    for field in fields:
+        for pattern in field.patterns:
+            if field.name in ('US_SSN', 'EMAIL_ADDRESS'):
+                assert hits[pattern] == all_hits[pattern]
+            else:
+                assert hits[pattern] == []
+
+
+def test_scan_truncated_by_max_matches():
+    budget = pattern_registry.PatternBudget(max_matches=1)
+    limited_registry = pattern_registry.PatternRegistry(fields, budget=budget)
+    hits = pattern_scanner.PatternScanner(fields, limited_registry).scan(
+        '078-05-1120 078-05-1121 a@b.com c@d.com '
+        'AA1B2**9ABA7 AA1B2**9ABA8')
+
+    ssn = field_factory.FieldFactory.create('US_SSN')
+    email = field_factory.FieldFactory.create('EMAIL_ADDRESS')
+    license = field_factory.FieldFactory.create('US_DRIVER_LICENSE')
+    for pattern in (ssn.patterns[0], email.patterns[0], license.patterns[0]):
+        assert len(hits[pattern]) == 1
+        assert pattern in hits.truncated
+
+
+def test_scan_truncated_by_time_budget():
+    budget = pattern_registry.PatternBudget(time_budget=0)
+    limited_registry = pattern_registry.PatternRegistry(fields, budget=budget)
+    hits = pattern_scanner.PatternScanner(fields, limited_registry).scan(
+        'my ssn is 078-05-1120 and my email is a@b.com')
+
+    assert all(len(spans) == 0 for spans in hits.values())
+    assert len(hits.truncated) > 0
+
+
+def test_scan_anchors_truncated_between_candidates(monkeypatch):
+    # The clock starts the scan, then moves past the budget at the third
+    # '@': the two emails found before are kept
+    email = field_factory.FieldFactory.create('EMAIL_ADDRESS')
+    budget = pattern_registry.PatternBudget(time_budget=1)
+    limited_registry = pattern_registry.PatternRegistry([email],
+                                                        budget=budget)
+    ticks = iter([0, 0, 0, 2])
+    monkeypatch.setattr(pattern_scanner.time, 'monotonic',
+                        lambda: next(ticks, 2))
+    hits = pattern_scanner.PatternScanner([email], limited_registry).scan(
+        'a@microsoft.com b@microsoft.com c@microsoft.com')
+
+    assert hits[email.patterns[0]] == [(0, 15), (16, 31)]
+    assert email.patterns[0] in hits.truncated
+
+
+class CountingRegex(object):
+    """Compiled regex counting its searches"""
+
+    searches = 0
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.groups = compiled.groups
+
+    def search(self, *args):
+        CountingRegex.searches += 1
+        return self.compiled.search(*args)
+
+    def match(self, *args):
+        return self.compiled.match(*args)
+
+
+def test_scan_union_without_truncated_regexes(monkeypatch):
+    # Once 'b' is out of time, the union stops only at the 'c'
+    b_field = regex_field('B', r'b')
+    b_field.patterns[0].time_budget = 1
+    c_field = regex_field('C', r'c')
+    limited_registry = pattern_registry.PatternRegistry([b_field, c_field])
+    compile_regex = re.compile
+    monkeypatch.setattr(pattern_scanner.re, 'compile',
+                        lambda *args, **kwargs: CountingRegex(
+                            compile_regex(*args, **kwargs)))
+    ticks = iter([0, 0])
+    monkeypatch.setattr(pattern_scanner.time, 'monotonic',
+                        lambda: next(ticks, 2))
+    CountingRegex.searches = 0
+    hits = pattern_scanner.PatternScanner(
+        [b_field, c_field], limited_registry).scan('b' * 20000 + ' c')
+
+    assert hits[b_field.patterns[0]] == [(0, 1)]
+    assert hits.truncated == {b_field.patterns[0]}
+    assert hits[c_field.patterns[0]] == [(20001, 20002)]
+    assert CountingRegex.searches <= 3
+
+
+def test_scan_union_with_time_budget_spent(monkeypatch):
+    budget = pattern_registry.PatternBudget(time_budget=1)
+    limited_registry = pattern_registry.PatternRegistry(fields, budget=budget)
+    scanner = pattern_scanner.PatternScanner(fields, limited_registry)
+    scanner.union = CountingRegex(scanner.union)
+    ticks = iter([0])
+    monkeypatch.setattr(pattern_scanner.time, 'monotonic',
+                        lambda: next(ticks, 2))
+    CountingRegex.searches = 0
+    hits = scanner.scan('b' * 20000 + ' 078-05-1120')
+
+    ssn = field_factory.FieldFactory.create('US_SSN')
+    assert CountingRegex.searches == 0
+    assert hits[ssn.patterns[0]] == []
+    assert ssn.patterns[0] in hits.truncated
+
+
+def test_scan_not_truncated_by_default():
+    hits = pattern_scanner.PatternScanner(fields, registry).scan(
+        '078-05-1120 078-05-1121 a@b.com c@d.com')
+
+    assert len(hits.truncated) == 0
+
+
+def test_scan_no_matches():
+    text = 'Lorem ipsum dolor sit amet'
+    hits = pattern_scanner.PatternScanner(fields, registry).scan(text)
+
+    assert all(len(spans) == 0 for spans in hits.values())
+
+
+def test_scan_demo_file():
+    path = os.path.dirname(__file__) + '/data/demo.txt'
+    text_file = open(path, 'r')
+    text = text_file.read()
+    text_file.close()
+
+    assert_same_as_finditer(text)
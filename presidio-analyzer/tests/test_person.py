@@ -1,5 +1,6 @@
 from analyzer import matcher, common_pb2
 from tests import *
+from field_types.globally import ner
 
 fieldType = common_pb2.FieldTypes()
 fieldType.name = common_pb2.FieldTypesEnum.Name(common_pb2.PERSON)
@@ -98,4 +99,35 @@ def test_person_full_name_complex_with_context():
     assert len(results) == 1
     assert results[0].text == name
     assert results[0].score >= matcher.NER_STRENGTH
-'''
\ No newline at end of file
+'''
+
+
+def test_entities_validated_once_for_all_ner_fields():
+    validate_result = ner.Ner.validate_result
+    validated = []
+
+    def counting_validate_result(self):
+        validated.append(self.text)
+        return validate_result(self)
+
+    ner.Ner.validate_result = counting_validate_result
+    try:
+        results = match.analyze_text(
+            'Dan Tailor came on May 1st',
+            field_types('PERSON', 'LOCATION', 'DATE_TIME', 'NRP'))
+    finally:
+        ner.Ner.validate_result = validate_result
+
+    assert [(result.field.name, result.text) for result in results] == [
+        ('PERSON', 'Dan Tailor'), ('DATE_TIME', 'May 1st')
+    ]
+    assert validated == ['Dan Tailor', 'May 1st']
+
+
+def test_check_label():
+    field = ner.Ner()
+    field.name = 'LOCATION'
+
+    assert field.check_label('GPE')
+    assert field.check_label('LOC')
+    assert not field.check_label('PERSON')
@@ -0,0 +1,120 @@
+from analyzer import matcher, common_pb2
+from tests import *
+import os
+import pytest
+import structured_input
+
+
+def values(text, leaves):
+    return [(text[start:end], keys) for start, end, keys in leaves]
+
+
+def test_key_keywords():
+    assert structured_input.key_keywords('ssn') == {'ssn'}
+    assert structured_input.key_keywords('card_number') == {
+        'card', 'number', 'card number'
+    }
+    assert structured_input.key_keywords('socialSecurity') == {
+        'social', 'security', 'social security'
+    }
+
+
+def test_parse_json():
+    text = '{"ssn": "078-05-1120", "ids": [{"phone": 4258829090}], ' \
+        '"x": [true, null, "a\\"b"]}'
+    leaves = structured_input.parse_json(text)
+
+    assert values(text, leaves) == [('078-05-1120', ('ssn', )),
+                                    ('4258829090', ('ids', 'phone')),
+                                    ('a\\"b', ('x', ))]
+
+
+def test_parse_json_labels():
+    text = '{"system": "ph\\u006fne", "value": "555-780-8673", ' \
+        '"rank": "1st", "use": "home"}'
+    leaves = structured_input.parse_json(text)
+
+    assert values(text, leaves)[1:] == [('555-780-8673', ('value', 'phone')),
+                                        ('1st', ('rank', )),
+                                        ('home', ('use', ))]
+
+
+def test_parse_invalid_json():
+    for text in ['{"ssn": }', '{"ssn": "1"', '["1"] x', '{ssn: 1}',
+                 '{"ssn": "1"]', '[1, ]', '[' * 100000]:
+        with pytest.raises(ValueError):
+            structured_input.parse_json(text)
+
+
+def test_parse_deeply_nested_json():
+    depth = 100000
+    text = '{"ids": ' * depth + '[{"ssn": "078-05-1120"}]' + '}' * depth
+    leaves = structured_input.parse_json(text)
+
+    assert values(text, leaves) == [('078-05-1120', ('ids', 'ssn'))]
+
+
+def test_parse_csv():
+    text = 'name,"card, number"\r\nJohn,"4012 ""8888"""\nJane\n'
+    leaves = structured_input.parse_csv(text)
+
+    assert values(text, leaves) == [('John', ('name', )),
+                                    ('4012 ""8888""', ('card, number', )),
+                                    ('Jane', ('name', ))]
+
+    with pytest.raises(ValueError):
+        structured_input.parse_csv('a,"b"c')
+
+
+def test_json_keys_are_context():
+    text = '{"ssn": "078-05-1120", "id": "078-05-1121", "078-05-1122": 1}'
+    results = match.analyze_text(text, field_types('US_SSN'),
+                                 input_format='json')
+
+    assert [(result.text, result.score > 0.8) for result in results] == [
+        ('078-05-1120', True), ('078-05-1121', False)
+    ]
+    assert text[results[0].location.start:results[0].location.end] == \
+        '078-05-1120'
+
+
+def test_csv_columns_are_context():
+    text = 'name,social_security_number\nJohn,078-05-1120\n'
+    results = match.analyze_text(text, field_types('US_SSN'),
+                                 input_format='csv')
+
+    assert len(results) == 1
+    assert results[0].score > 0.8
+
+
+def test_nlp_runs_only_for_ner_field_types():
+    nlp = match.nlp
+    match.nlp = CountingNlp(nlp)
+    try:
+        match.analyze_text('{"ssn": "078-05-1120"}', field_types('US_SSN'),
+                           input_format='json')
+        assert match.nlp.calls == []
+
+        results = match.analyze_text('{"name": "Dan Tailor"}',
+                                     field_types('PERSON'),
+                                     input_format='json')
+        assert match.nlp.calls == ['nlp']
+        assert results[0].text == 'Dan Tailor'
+    finally:
+        match.nlp = nlp
+
+
+def test_invalid_input_format():
+    with pytest.raises(ValueError):
+        match.analyze_text('{"ssn": ', field_types('US_SSN'),
+                           input_format='json')
+    with pytest.raises(ValueError):
+        match.analyze_text('ssn', field_types('US_SSN'), input_format='xml')
+
+
+def test_synthetic_json_file():
+    path = os.path.dirname(__file__) + '/data/synthetic.json'
+    with open(path, 'r') as json_file:
+        text = json_file.read()
+
+    assert len(match.analyze_text(text, [], input_format='json')) > 30
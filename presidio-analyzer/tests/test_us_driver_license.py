@@ -1,5 +1,6 @@
 from analyzer import matcher, common_pb2
 from tests import *
+from field_types.us import driver_license
 import os
 
 fieldType = common_pb2.FieldTypes()
@@ -39,6 +40,13 @@ def test_invalid_us_driver_license_weak_WA():
     assert len(results) == 0
 
 
+def test_invalid_us_driver_license_weak_WA_letters_followed_by_digits():
+    word = 'relationship'
+    results = match.analyze_text(word + ' 2018', types)
+
+    assert all(result.text != word for result in results)
+
+
 # Driver License - Alphanumeric (weak) - 0.3
 # Regex:r'\b([A-Z][0-9]{3,6}|[A-Z][0-9]{5,9}|[A-Z][0-9]{6,8}|[A-Z][0-9]{4,8}|[A-Z][0-9]{9,11}|[A-Z]{1,2}[0-9]{5,6}|H[0-9]{8}|V[0-9]{6}|X[0-9]{8}|A-Z]{2}[0-9]{2,5}|[A-Z]{2}[0-9]{3,7}|[0-9]{2}[A-Z]{3}[0-9]{5,6}|[A-Z][0-9]{13,14}|[A-Z][0-9]{18}|[A-Z][0-9]{6}R|[A-Z][0-9]{9}|[A-Z][0-9]{1,12}|[0-9]{9}[A-Z]|[A-Z]{2}[0-9]{6}[A-Z]|[0-9]{8}[A-Z]{2}|[0-9]{3}[A-Z]{2}[0-9]{4}|[A-Z][0-9][A-Z][0-9][A-Z]|[0-9]{7,8}[A-Z])\b'
 
@@ -139,3 +147,40 @@ def test_load_from_file():
     text = text_file.read()
     results = match.analyze_text(text, types)
     assert len(results) == 1
+
+
+def test_matching_states():
+    assert driver_license.matching_states('H12234567') == (
+        'AZ', 'FL', 'HI', 'KS', 'KY', 'MA', 'MO', 'MT', 'NE', 'OH')
+    assert driver_license.matching_states('AA1B2**9ABA7') == ('WA', )
+    assert driver_license.matching_states('12AB') == ()
+    assert driver_license.matching_states('C12T345672') == ()
+
+
+def test_matching_states_of_same_shape():
+    assert driver_license.matching_states('X12345678') == \
+        driver_license.matching_states('X87654321')
+    assert 'NV' in driver_license.matching_states('X12345678')
+    assert 'NV' not in driver_license.matching_states('Y12345678')
+
+
+def test_valid_us_driver_license_two_letters_CO():
+    num = 'AB12'
+    results = match.analyze_text(num, types)
+
+    assert len(results) == 1
+    assert results[0].text == num
+
+
+def test_us_driver_license_states_details():
+    details = {}
+    results = match.analyze_text('H12234567 or X12345678', types,
+                                 details=details)
+
+    assert [result.location.start for result in results] == [0, 13]
+    assert details == {
+        'driver-license-states': {
+            0: 'AZ,FL,HI,KS,KY,MA,MO,MT,NE,OH',
+            13: 'AZ,FL,KS,KY,MA,MO,MT,NE,NV,OH'
+        }
+    }